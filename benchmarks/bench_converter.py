@@ -0,0 +1,249 @@
+from html.parser import HTMLParser
+import json, os, random, re, shutil, subprocess, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import utils.html_converter as html_converter
+import utils.deepseek_driver as deepseek
+import corpus
+
+# =============================================================================================================================
+# Equivalence
+# =============================================================================================================================
+
+_FRAGMENTS = [
+    "<p>", "</p>", "<li>", "</li>", "<ul>", "</ul>", '<ol start="2">', "</ol>", "<h3>", "</h3>", "<strong>", "</strong>",
+    "<em>", "</em>", "<code>", "</code>", "<br>", "<br/>", "<pre>", "</pre>", '<span class="x">', "</span>", "<hr>",
+    "<!-- c -->", "\n", "\n\n", " ", "  \n ", "text", "*act*", '"say"', "&amp;", "&lt;", "&gt;", "&nbsp;", "&quot;",
+    "AT&amp;T", "&lt;3", "**", "``", '"', "*", "\t", '<li class="a">', '<div class="md-code-block">', "</div>",
+]
+
+def _legacy_text(html: str) -> str:
+    return html_converter.clean_text(html_converter._legacy_raw_text(html)).strip("\n")
+
+def check_equivalence(fuzz_cases: int = 20000, seed: int = 0) -> int:
+    failures = 0
+    samples = list(corpus.MESSAGES) + [corpus.synthetic_message(size, seed) for size in (1024, 16384)]
+
+    rng = random.Random(seed)
+    for _ in range(fuzz_cases):
+        samples.append("".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(0, 25))))
+
+    for html in samples:
+        for final in (True, False):
+            expected = html_converter._legacy_raw_text(html, final)
+            actual = html_converter.html_to_raw_text(html, final)
+            if actual != expected:
+                failures += 1
+                if failures <= 5:
+                    print(f"Mismatch (final={final}): {html!r}\n  expected: {expected!r}\n  actual:   {actual!r}")
+
+    print(f"Equivalence: {len(samples) * 2 - failures}/{len(samples) * 2} cases identical.")
+    return failures
+
+# =============================================================================================================================
+# In-page extraction
+# =============================================================================================================================
+
+# A minimal DOM in node, enough for the page's extractText walker.
+_NODE_HARNESS = """
+const {source, trees} = JSON.parse(require("fs").readFileSync(0, "utf8"));
+const extractText = new Function(source + "\\nreturn extractText;")();
+const build = (spec, parent) => {
+    if (typeof spec === "string") return {nodeType: 3, data: spec, parentElement: parent};
+    if (spec.comment !== undefined) return {nodeType: 8, data: spec.comment, parentElement: parent};
+    const node = {nodeType: 1, tagName: spec.tag.toUpperCase(), attributes: Object.keys(spec.attrs), parentElement: parent};
+    node.childNodes = spec.children.map((child) => build(child, node));
+    node.lastChild = node.childNodes.length ? node.childNodes[node.childNodes.length - 1] : null;
+    return node;
+};
+process.stdout.write(JSON.stringify(trees.map((tree) => extractText(build(tree, null)))));
+"""
+
+_VOID_TAGS = {"br", "hr", "img", "input", "wbr"}
+_PAGE_TEXT = ["text", "*act*", '"say"', " ", "  ", "\n", "\n\n", "  \n ", "\t", "\u00a0", "**", "``", '"', "*", "a & b", "a < b", "x > y"]
+# Text that only looks like markup once decoded makes the Python converter fall back to a chain that drops it.
+_ESCAPED_MARKUP = re.compile(r'<[A-Za-z/!?]|&[#A-Za-z]|[<&]$')
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = {"tag": "div", "attrs": {}, "children": []}
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = {"tag": tag, "attrs": {name: value or "" for name, value in attrs}, "children": []}
+        self.stack[-1]["children"].append(node)
+        if tag not in _VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index]["tag"] == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1]["children"].append(data)
+
+    def handle_comment(self, data):
+        self.stack[-1]["children"].append({"comment": data})
+
+def _parse_tree(html: str) -> dict:
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def _element(tag: str, children: list, attrs: dict = None) -> dict:
+    return {"tag": tag, "attrs": attrs or {}, "children": children}
+
+def _maybe_class(rng: random.Random) -> dict:
+    return {"class": "x"} if rng.random() < 0.05 else {}
+
+def _random_inline(rng: random.Random, depth: int = 0) -> list:
+    nodes = []
+    for _ in range(rng.randint(0, 4)):
+        kind = rng.random()
+        if kind < 0.5 or depth > 2:
+            nodes.append(rng.choice(_PAGE_TEXT))
+        elif kind < 0.65:
+            nodes.append(_element("strong", _random_inline(rng, depth + 1), _maybe_class(rng)))
+        elif kind < 0.8:
+            nodes.append(_element("em", _random_inline(rng, depth + 1), _maybe_class(rng)))
+        elif kind < 0.87:
+            nodes.append(_element("code", [rng.choice(_PAGE_TEXT)], _maybe_class(rng)))
+        elif kind < 0.94:
+            nodes.append(_element("br", [], _maybe_class(rng)))
+        else:
+            nodes.append(_element("span", [rng.choice(_PAGE_TEXT)], {"class": "token"}))
+    return nodes
+
+def _random_blocks(rng: random.Random, depth: int = 0) -> list:
+    # Markup shaped like what DeepSeek renders from markdown, with stray whitespace and comments between blocks.
+    nodes = []
+    for _ in range(rng.randint(0 if depth else 1, 4)):
+        kind = rng.random()
+        if kind < 0.4 or depth > 2:
+            nodes.append(_element("p", _random_inline(rng)))
+        elif kind < 0.5:
+            nodes.append(_element("h3", _random_inline(rng)))
+        elif kind < 0.65:
+            items = []
+            for _ in range(rng.randint(1, 3)):
+                item = _random_blocks(rng, depth + 1) if rng.random() < 0.5 else _random_inline(rng)
+                items.append(_element("li", item, _maybe_class(rng)))
+            nodes.append(_element(rng.choice(["ul", "ol"]), items))
+        elif kind < 0.73:
+            code = [_element("code", _random_inline(rng, 3))] if rng.random() < 0.5 else _random_inline(rng, 3)
+            nodes.append(_element("pre", code))
+        elif kind < 0.8:
+            nodes.append(_element("blockquote", _random_blocks(rng, depth + 1)))
+        elif kind < 0.86:
+            nodes.append(_element("div", _random_blocks(rng, depth + 1), {"class": "md-code-block"}))
+        elif kind < 0.9:
+            nodes.append(_element("hr", []))
+        elif kind < 0.96:
+            nodes.append(rng.choice(["\n", " ", "\n\n"]))
+        else:
+            nodes.append({"comment": " c "})
+    return nodes
+
+def _serialize(node) -> str:
+    # What outerHTML gives for the tree, which is the markup the Python converter is fed.
+    if isinstance(node, str):
+        return node.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\u00a0", "&nbsp;")
+    if "comment" in node:
+        return f"<!--{node['comment']}-->"
+
+    attributes = "".join(f' {name}="{value}"' for name, value in node["attrs"].items())
+    if node["tag"] in _VOID_TAGS:
+        return f"<{node['tag']}{attributes}>"
+    return f"<{node['tag']}{attributes}>" + "".join(_serialize(child) for child in node["children"]) + f"</{node['tag']}>"
+
+def _has_escaped_markup(node) -> bool:
+    if isinstance(node, str):
+        return bool(_ESCAPED_MARKUP.search(node))
+    return any(_has_escaped_markup(child) for child in node.get("children", []))
+
+def check_page_extraction(fuzz_cases: int = 3000, seed: int = 0) -> int:
+    # Runs the page's own extractText in node against the same trees the Python converter sees serialized.
+    if not shutil.which("node"):
+        print("Page extraction: skipped, node is not installed.")
+        return 0
+
+    rng = random.Random(seed)
+    trees = [_parse_tree(html) for html in corpus.MESSAGES + [corpus.synthetic_message(size, seed) for size in (1024, 16384)]]
+    trees += [_element("div", _random_blocks(rng)) for _ in range(fuzz_cases)]
+    trees = [tree for tree in trees if not _has_escaped_markup(tree)]
+
+    payload = json.dumps({"source": deepseek._READ_STATE_SCRIPT, "trees": trees})
+    output = subprocess.run(["node", "-e", _NODE_HARNESS], input=payload, capture_output=True, text=True, encoding="utf-8", check=True).stdout
+
+    failures = 0
+    for tree, actual in zip(trees, json.loads(output)):
+        html = "".join(_serialize(child) for child in tree["children"])
+        expected = html_converter.html_to_text(html)
+        if actual != expected:
+            failures += 1
+            if failures <= 5:
+                print(f"Page mismatch: {html!r}\n  expected: {expected!r}\n  actual:   {actual!r}")
+
+    print(f"Page extraction: {len(trees) - failures}/{len(trees)} cases identical.")
+    return failures
+
+# =============================================================================================================================
+# Timing
+# =============================================================================================================================
+
+def _best_of(function, argument, repeat: int = 5) -> float:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        elapsed = time.perf_counter() - start
+        if elapsed > 0.2:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+def _stream_full(blocks: list) -> None:
+    # One conversion of the whole message per tick, as before the incremental converter.
+    for end in range(1, len(blocks) + 1):
+        html_converter.html_to_text("".join(blocks[:end]))
+
+def _stream_incremental(blocks: list) -> None:
+    converter = deepseek.MessageConverter()
+    for end in range(1, len(blocks) + 1):
+        converter.update({"count": 1, "offset": converter.stable, "blocks": blocks[converter.stable:end]})
+
+def run_timings(sizes: tuple = (1024, 16384, 131072, 1048576)) -> None:
+    print(f"\n{'size':>10} {'legacy ms':>12} {'single-pass ms':>16} {'speedup':>9}")
+    for size in sizes:
+        html = corpus.synthetic_message(size)
+        legacy = _best_of(_legacy_text, html)
+        current = _best_of(html_converter.html_to_text, html)
+        print(f"{len(html):>10} {legacy * 1000:>12.3f} {current * 1000:>16.3f} {legacy / current:>8.1f}x")
+
+    print(f"\n{'stream size':>11} {'full ms':>10} {'incremental ms':>15} {'speedup':>9}")
+    for size in sizes[:3]:
+        blocks = corpus.synthetic_blocks(size)
+        full = _best_of(_stream_full, blocks, repeat=3)
+        incremental = _best_of(_stream_incremental, blocks, repeat=3)
+        print(f"{size:>11} {full * 1000:>10.1f} {incremental * 1000:>15.1f} {full / incremental:>8.1f}x")
+
+def main() -> None:
+    failures = check_equivalence() + check_page_extraction()
+    run_timings()
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
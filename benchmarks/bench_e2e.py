@@ -0,0 +1,187 @@
+import argparse, json, os, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import utils.deepseek_driver as deepseek
+import utils.html_converter as html_converter
+import utils.generation_recorder as generation_recorder
+import utils.storage_manager as storage
+import api
+import corpus
+import replay_driver
+
+# =============================================================================================================================
+# Setup
+# =============================================================================================================================
+
+class _SilentTextbox:
+    def colored_add(self, text: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+def _payload(index: int, streaming: bool) -> dict:
+    # A distinct prompt per request keeps the cache and request coalescing out of the measurement.
+    return {
+        "stream": streaming,
+        "messages": [
+            {"role": "system", "content": 'DATA1: "Aria" DATA2: "Sam"\nYou are Aria, a travelling bard.'},
+            {"role": "assistant", "content": "Well met, traveller."},
+            {"role": "user", "content": f"Tell me a story. ({index})"}
+        ]
+    }
+
+def setup(sessions: int, tokens_per_second: float, first_token_delay: float, event_streaming: bool, page_extraction: bool, recordings: list = None) -> list:
+    api.textbox = _SilentTextbox()
+    api.config = {
+        "models": {"deepseek": {"event_streaming": event_streaming, "page_extraction": page_extraction}},
+        "api": {}
+    }
+    deepseek.manager = storage.StorageManager()
+
+    responses = recordings or [replay_driver.frames_from_html(html, tokens_per_second, first_token_delay) for html in corpus.MESSAGES]
+    api.pool.close()
+    drivers = []
+    for _ in range(sessions):
+        driver = replay_driver.ReplayDriver(responses)
+        api.metrics.instrument_driver(driver)
+        api.pool.add(driver)
+        drivers.append(driver)
+    return drivers
+
+# =============================================================================================================================
+# Requests
+# =============================================================================================================================
+
+def run_request(client, index: int, streaming: bool) -> dict:
+    cpu = time.thread_time()
+    started = time.perf_counter()
+    first_chunk = None
+    text = ""
+
+    response = client.post("/chat/completions", json=_payload(index, streaming), buffered=not streaming)
+    if streaming:
+        for chunk in response.response:
+            # The role chunk and ": keep-alive" comments arrive before any text, so they do not count.
+            for line in (chunk.decode() if isinstance(chunk, bytes) else chunk).splitlines():
+                if line.startswith("data: "):
+                    content = json.loads(line[6:])["choices"][0]["delta"].get("content", "")
+                    if content and first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                    text += content
+        response.close()
+    else:
+        text = response.get_json()["choices"][0]["message"]["content"]
+        first_chunk = time.perf_counter() - started
+
+    return {
+        "status": response.status_code,
+        "latency": time.perf_counter() - started,
+        "first_chunk": first_chunk if first_chunk is not None else float("nan"),
+        "cpu": time.thread_time() - cpu,
+        "chars": len(text),
+        "text": text
+    }
+
+def run_load(requests: int, concurrency: int, streaming: bool) -> list:
+    client = api.app.test_client()
+    results, lock = [], threading.Lock()
+    counter = iter(range(requests))
+
+    def worker() -> None:
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            result = run_request(client, index, streaming)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+# =============================================================================================================================
+# Streaming Check
+# =============================================================================================================================
+
+def check_streaming(tokens_per_second: float, event_streaming: bool, page_extraction: bool) -> int:
+    # Streamed deltas must add up to the same reply a non-streaming request returns for the same page.
+    client = api.app.test_client()
+    failures = 0
+    for index, html in enumerate(corpus.MESSAGES):
+        setup(1, tokens_per_second, 0.05, event_streaming, page_extraction,
+              [replay_driver.frames_from_html(html, tokens_per_second, 0.05)])
+        text = html_converter.html_to_text(html)
+        expected = text + deepseek.get_closing_symbol(text) if text else "Error receiving response."
+        streamed = run_request(client, index * 2, True)["text"]
+        whole = run_request(client, index * 2 + 1, False)["text"]
+        if streamed != expected or whole != expected:
+            failures += 1
+            print(f"Reply {index}: expected {expected!r}\n  streamed     {streamed!r}\n  non-streamed {whole!r}")
+
+    print(f"Streaming check: {failures}/{len(corpus.MESSAGES)} replies differ.")
+    return failures
+
+# =============================================================================================================================
+# Report
+# =============================================================================================================================
+
+def _percentile(values: list, percent: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+def report(label: str, results: list, wall: float, process_cpu: float) -> None:
+    latencies = [r["latency"] for r in results]
+    first_chunks = [r["first_chunk"] for r in results]
+    failed = sum(1 for r in results if r["status"] != 200 or not r["chars"])
+
+    print(f"\n{label}: {len(results)} requests in {wall:.2f}s, {failed} failed")
+    print(f"  {'':<18}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, values in (("latency (s)", latencies), ("first chunk (s)", first_chunks)):
+        print(f"  {name:<18}" + "".join(f"{_percentile(values, p):>10.3f}" for p in (50, 95, 99)))
+    print(f"  CPU per response: {process_cpu / max(1, len(results)) * 1000:.1f} ms (process), "
+          f"{sum(r['cpu'] for r in results) / max(1, len(results)) * 1000:.1f} ms (client thread)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive /chat/completions end to end against replayed DeepSeek output.")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--event-streaming", action="store_true")
+    parser.add_argument("--page-extraction", action="store_true")
+    parser.add_argument("--recordings", help="Directory of recorded generations to replay instead of the corpus.")
+    parser.add_argument("--check", action="store_true", help="Only verify that streamed replies match non-streamed ones.")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_streaming(args.tokens_per_second, args.event_streaming, args.page_extraction)
+        api.pool.close()
+        sys.exit(1 if failures else 0)
+
+    recordings = None
+    if args.recordings:
+        recordings = generation_recorder.load_fixtures(args.recordings)
+        if not recordings:
+            sys.exit(f"No recordings found in {args.recordings}")
+
+    for streaming in (False, True):
+        setup(args.sessions, args.tokens_per_second, args.first_token_delay, args.event_streaming, args.page_extraction, recordings)
+        cpu, started = time.process_time(), time.perf_counter()
+        results = run_load(args.requests, args.concurrency, streaming)
+        report("Streaming" if streaming else "Non-streaming", results, time.perf_counter() - started, time.process_time() - cpu)
+
+    api.pool.close()
+
+if __name__ == "__main__":
+    main()
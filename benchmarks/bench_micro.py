@@ -0,0 +1,147 @@
+import argparse, json, os, platform, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import utils.response_utils as response_utils
+import utils.html_converter as html_converter
+import utils.deepseek_driver as deepseek
+import utils.generation_recorder as generation_recorder
+import corpus
+
+# =============================================================================================================================
+# Cases
+# =============================================================================================================================
+
+_HISTORY_SIZES = (10, 100, 1000, 10000)
+_TEXT_SIZES = (1024, 16384, 131072, 1048576, 4194304)
+
+def _long_reply(size: int) -> str:
+    return html_converter.html_to_text(corpus.synthetic_message(size))
+
+def _legacy_process_character(payload: dict) -> str:
+    return response_utils._legacy_character_info(payload["messages"], payload["temperature"], payload["max_tokens"])
+
+def build_cases(quick: bool = False, recordings: list = None) -> list:
+    # (name, function, argument); names double as keys in the baseline file.
+    history_sizes = _HISTORY_SIZES[:3] if quick else _HISTORY_SIZES
+    text_sizes = _TEXT_SIZES[:3] if quick else _TEXT_SIZES
+    cases = []
+
+    for messages in history_sizes:
+        payload = corpus.synthetic_history(messages)
+        size = sum(len(m["content"]) for m in payload["messages"])
+        cases.append((f"process_character/{messages}msg/{size // 1024}KB", response_utils.process_character, payload))
+        cases.append((f"process_character_legacy/{messages}msg/{size // 1024}KB", _legacy_process_character, payload))
+
+    for size in (16, 1024, 65536) + (() if quick else (1048576,)):
+        cases.append((f"create_response_streaming/{size}B", response_utils.create_response_streaming, "x" * size))
+
+    for size in text_sizes:
+        html = corpus.synthetic_message(size)
+        cases.append((f"html_to_text/{size // 1024}KB", html_converter.html_to_text, html))
+        cases.append((f"_remove_em_inside_strong/{size // 1024}KB", html_converter._remove_em_inside_strong, html))
+        cases.append((f"get_closing_symbol/{size // 1024}KB", deepseek.get_closing_symbol, _long_reply(size)))
+
+    for index, frames in enumerate(recordings or []):
+        html = frames[-1][1]
+        cases.append((f"html_to_text/recorded{index}/{len(html) // 1024}KB", html_converter.html_to_text, html))
+
+    return cases
+
+# =============================================================================================================================
+# Measurement
+# =============================================================================================================================
+
+def measure_speed(function, argument, repeat: int = 5, budget: float = 0.2) -> float:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        elapsed = time.perf_counter() - start
+        if elapsed > budget:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        best = min(best, (time.perf_counter() - start) / loops)
+    return 1.0 / best
+
+def measure_allocations(function, argument) -> dict:
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = function(argument)
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    # Peak is the transient working set of one call; retained is what the result keeps alive.
+    return {"peak_bytes": max(0, peak - baseline), "retained_bytes": max(0, current - baseline)}
+
+def run(cases: list) -> dict:
+    results = {}
+    print(f"{'case':<48} {'ops/sec':>12} {'peak KB':>10} {'kept KB':>10}")
+    for name, function, argument in cases:
+        ops = measure_speed(function, argument)
+        allocations = measure_allocations(function, argument)
+        results[name] = {"ops_per_sec": ops, **allocations}
+        print(f"{name:<48} {ops:>12.1f} {allocations['peak_bytes'] / 1024:>10.1f} {allocations['retained_bytes'] / 1024:>10.1f}")
+    return results
+
+# =============================================================================================================================
+# Baseline
+# =============================================================================================================================
+
+def save_baseline(path: str, results: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(), "cases": results}, f, indent=2)
+    print(f"\nBaseline saved to {path}")
+
+def compare(path: str, results: dict, threshold: float) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("cases", {})
+
+    regressions = 0
+    print(f"\n{'case':<48} {'ops/sec':>10} {'peak mem':>10}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            print(f"{name:<48} {'new':>10} {'new':>10}")
+            continue
+
+        speed = current["ops_per_sec"] / previous["ops_per_sec"] - 1
+        memory = (current["peak_bytes"] + 1) / (previous["peak_bytes"] + 1) - 1
+        regressed = speed < -threshold or memory > threshold
+        regressions += regressed
+        print(f"{name:<48} {speed:>+9.1%} {memory:>+9.1%}{'  REGRESSION' if regressed else ''}")
+
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}.")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the per-request and per-tick text functions.")
+    parser.add_argument("--quick", action="store_true", help="Skip the multi-megabyte inputs.")
+    parser.add_argument("--recordings", help="Directory of recorded generations to add as conversion inputs.")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as a baseline file.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare the results against a baseline file.")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Relative change reported as a regression.")
+    args = parser.parse_args()
+
+    recordings = None
+    if args.recordings:
+        recordings = generation_recorder.load_fixtures(args.recordings)
+
+    results = run(build_cases(args.quick, recordings))
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+    if args.compare:
+        sys.exit(1 if compare(args.compare, results, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import random
+
+# =============================================================================================================================
+# Recorded-style DeepSeek message markup
+# =============================================================================================================================
+
+MESSAGES = [
+    '<p>*She glances up from the book, a faint smile tugging at her lips.* "You\'re late again."</p>',
+    '<p><em>The rain keeps falling.</em> "I know," <strong>he</strong> mutters, shaking the water from his coat.</p><p>*He drops into the chair across from her.*</p>',
+    '<p><strong>Status:</strong> <em>Wounded</em></p><ul><li><p><strong>HP:</strong> 12/40</p></li><li><p><strong>Mana:</strong> 3/20</p></li></ul><p>"We need to rest," <em>she says.</em></p>',
+    '<h3>Chapter One</h3><p>The tavern smelled of smoke &amp; ale.</p><hr><p>&quot;Another round?&quot; the barkeep asked.</p>',
+    '<ol start="1"><li><p>Draw your sword</p></li><li><p>Hide behind the cart</p></li><li><p>Call for help</p></li></ol><p>*What do you do?*</p>',
+    '<p>She whispered, "<strong><em>run</em></strong>."</p>',
+    '<p>Line one<br>Line two<br/>Line three</p>',
+    '<p>The code reads <code>open_gate()</code>, nothing more.</p>',
+    '<div class="md-code-block"><div class="md-code-block-banner-wrap"><div class="md-code-block-banner"><span class="d813de27">python</span></div></div><pre><span class="token keyword">def</span> <span class="token function">greet</span><span class="token punctuation">(</span><span class="token punctuation">)</span><span class="token punctuation">:</span>\n    <span class="token keyword">return</span> <span class="token string">"hi"</span>\n\n\n</pre></div><p>That is all.</p>',
+    '<div class="markdown-table-wrapper"><table><thead><tr><th>Name</th><th>Role</th></tr></thead><tbody><tr><td>Aria</td><td>Mage</td></tr><tr><td>Bran</td><td>Knight</td></tr></tbody></table></div><p>*The party assembles.*</p>',
+    '<p>**He laughs.** ""Fine, fine.""</p>',
+    '<p>*grins *and leans closer.</p>',
+    '<p>Temperature: 5&nbsp;°C &lt; 10&nbsp;°C &gt; 0&nbsp;°C</p>',
+    '<p>She loves <em>Tom &amp; Jerry</em> &amp; <em>AT&amp;T</em> adverts.</p>',
+    '<p>Literal markup: &lt;b&gt;bold&lt;/b&gt; stays text?</p>',
+    '<ul>\n<li><p>first</p></li>\n<li><p>second</p></li>\n</ul>\n',
+    '<p>Ends with a break</p>\n',
+    '<p>Unfinished senten',
+    '<ul><li><p>Nested</p><ul><li><p>deeper <strong>bold <em>mixed</em></strong></p></li></ul></li></ul>',
+    '<p>   </p><p>\n</p><p>text after blanks</p>',
+    '<p>😀 emoji and ünïcödé — dashes … ellipsis</p>',
+    '<blockquote><p>A quoted line.</p></blockquote><p>*She closes the letter.*</p>',
+]
+
+_SENTENCES = [
+    '*She steps closer, eyes narrowing.*',
+    '"You really thought I wouldn\'t notice?"',
+    '<strong>The door</strong> creaks open behind them.',
+    '<em>A cold wind</em> sweeps through the hall &amp; the candles flicker.',
+    '"Stay <em>behind</em> me," he whispers.',
+    'The map shows a path marked <code>north-gate</code>.',
+]
+
+# =============================================================================================================================
+# Synthetic generators
+# =============================================================================================================================
+
+def synthetic_message(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    blocks = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.75:
+            block = "<p>" + " ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 4))) + "</p>"
+        elif kind < 0.9:
+            items = "".join(f"<li><p>{rng.choice(_SENTENCES)}</p></li>" for _ in range(rng.randint(2, 5)))
+            block = f"<ul>{items}</ul>"
+        elif kind < 0.97:
+            block = f"<h3>Scene {len(blocks)}</h3>"
+        else:
+            block = "<hr>"
+        blocks.append(block)
+        length += len(block)
+    return "".join(blocks)
+
+def synthetic_blocks(size: int, seed: int = 0) -> list:
+    # Same content as synthetic_message, split the way the page serializes top-level nodes.
+    html = synthetic_message(size, seed)
+    blocks, depth, start, i = [], 0, 0, 0
+    while i < len(html):
+        if html.startswith("</", i):
+            depth -= 1
+            i = html.index(">", i) + 1
+            if depth == 0:
+                blocks.append(html[start:i])
+                start = i
+            continue
+        if html.startswith("<hr>", i) and depth == 0:
+            blocks.append("<hr>")
+            i += 4
+            start = i
+            continue
+        if html[i] == "<":
+            depth += 1
+            i = html.index(">", i) + 1
+            continue
+        i += 1
+    return blocks
+
+
+_LINES = [
+    "*{name} tilts her head, studying the stranger.*",
+    '"We leave at dawn. Pack light."',
+    "The fire crackles, throwing long shadows across the tent.",
+    '*He sets the mug down harder than intended.* "Fine."',
+    "Rain drums against the shutters as the argument drags on.",
+    '"Temperature {{temperature}}, no more than {{max_tokens}} tokens."',
+]
+
+def synthetic_history(messages: int, seed: int = 0, reply_size: int = 400) -> dict:
+    # A SillyTavern-style request body with a character card and a long alternating chat.
+    rng = random.Random(seed)
+    history = [{"role": "system", "content": 'DATA1: "Aria" DATA2: "Sam"\nAria is a travelling bard with a sharp tongue. [r1]\n\n\n\nScenario: a caravan crossing the desert.'}]
+    for index in range(messages):
+        role = "assistant" if index % 2 else "user"
+        content = []
+        while sum(len(line) for line in content) < (reply_size if role == "assistant" else reply_size // 4):
+            content.append(rng.choice(_LINES).replace("{name}", "Aria"))
+        history.append({"role": role, "content": " ".join(content)})
+    history.append({"role": "user", "content": "Continue the story."})
+    return {"messages": history, "temperature": 0.8, "max_tokens": 400, "stream": True}
\ No newline at end of file
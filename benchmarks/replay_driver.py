@@ -0,0 +1,356 @@
+import utils.deepseek_driver as deepseek
+import utils.html_converter as html_converter
+from typing import List, Optional, Sequence, Tuple
+import hashlib, re, threading, time
+
+# =============================================================================================================================
+# Replay Frames
+# =============================================================================================================================
+
+_TOKEN = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][^\s/>]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>|[^<]+|<', re.DOTALL)
+_WORD = re.compile(r'\s*\S+\s*|\s+')
+
+def split_nodes(html: str) -> List[str]:
+    # Top-level child nodes of a message, serialized the way the page's readState sends them.
+    nodes, depth, last_text = [], 0, False
+    for match in _TOKEN.finditer(html):
+        token, slash, name = match.group(0), match.group(1), (match.group(2) or "").lower()
+        text = not name and not token.startswith("<!--")
+        if depth == 0 and not (text and last_text):
+            nodes.append(token)
+        else:
+            nodes[-1] += token
+
+        if depth == 0:
+            last_text = text
+        if name and not slash and name not in html_converter._VOID_TAGS:
+            depth += 1
+        elif name and slash:
+            depth = max(0, depth - 1)
+
+    return nodes
+
+def frames_from_html(html: str, tokens_per_second: float = 50, first_token_delay: float = 0.5) -> List[Tuple[float, str]]:
+    # Reveals the message one word at a time, closing every open tag so each frame is well formed.
+    frames, written, stack = [], "", []
+    step = 1.0 / max(tokens_per_second, 0.001)
+    moment = first_token_delay
+
+    for match in _TOKEN.finditer(html):
+        token, slash, name = match.group(0), match.group(1), (match.group(2) or "").lower()
+        if name:
+            written += token
+            if slash:
+                if name in stack:
+                    del stack[len(stack) - 1 - stack[::-1].index(name):]
+            elif name not in html_converter._VOID_TAGS:
+                stack.append(name)
+            continue
+
+        for word in _WORD.findall(token):
+            written += word
+            frames.append((moment, written + "".join(f"</{tag}>" for tag in reversed(stack))))
+            moment += step
+
+    if not frames or frames[-1][1] != html:
+        frames.append((moment, html))
+    return frames
+
+# =============================================================================================================================
+# Replay Elements
+# =============================================================================================================================
+
+class ReplayElement:
+    def __init__(self, driver: "ReplayDriver", kind: str):
+        self.driver = driver
+        self.kind = kind
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self.driver._attribute(self.kind, name)
+
+    def clear(self) -> None:
+        self.driver._command("clearElement")
+        if self.kind == "input":
+            self.driver.input_value = ""
+
+    def send_keys(self, *values) -> None:
+        self.driver._command("sendKeysToElement")
+        if self.kind == "file":
+            self.driver.attached_file = "".join(str(value) for value in values)
+
+    def click(self) -> None:
+        self.driver._command("clickElement")
+        self.driver._click(self.kind)
+
+# =============================================================================================================================
+# Replay Driver
+# =============================================================================================================================
+
+class ReplayDriver:
+    """Stands in for a SeleniumBase Driver on chat.deepseek.com and replays recorded message frames."""
+
+    def __init__(self, responses: Sequence[Sequence[Tuple[float, str]]], url: str = "https://chat.deepseek.com/", tail: float = 0.2):
+        self.responses = [list(frames) for frames in responses]
+        self.url = url
+        self.tail = tail
+        self.title = "DeepSeek"
+        self.commands = 0
+        self.prompts: List[str] = []
+        self.input_value = ""
+        self.attached_file = ""
+        self.deepthink = False
+        self.search = False
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._frames: List[Tuple[float, str]] = []
+        self._started_at = None
+        self._history: List[str] = []
+        self._observed = None
+        self._previous_text = None
+
+    # =========================================================================================================================
+    # Page State
+    # =========================================================================================================================
+
+    def _command(self, name: str) -> None:
+        # Every command goes through execute() so WebDriver instrumentation sees it.
+        self.execute(name)
+
+    def execute(self, command: str, params: Optional[dict] = None) -> dict:
+        self.commands += 1
+        return {"value": None}
+
+    def _elapsed(self) -> float:
+        return time.monotonic() - self._started_at if self._started_at is not None else 0.0
+
+    def _frame_index(self) -> int:
+        elapsed = self._elapsed()
+        index = -1
+        for position, (moment, _) in enumerate(self._frames):
+            if moment > elapsed:
+                break
+            index = position
+        return index
+
+    def is_generating(self) -> bool:
+        with self._lock:
+            if self._started_at is None or not self._frames:
+                return False
+            return self._elapsed() < self._frames[-1][0] + self.tail
+
+    def _messages(self) -> List[str]:
+        with self._lock:
+            messages = list(self._history)
+            if self._started_at is not None:
+                index = self._frame_index()
+                if index >= 0:
+                    messages.append(self._frames[index][1])
+            return messages
+
+    def _send(self) -> None:
+        with self._lock:
+            if self._started_at is not None and self._frames:
+                self._history.append(self._frames[-1][1])
+
+            self.prompts.append(self.input_value or self.attached_file)
+            self.input_value = ""
+            self.attached_file = ""
+            self._frames = self.responses[self._next % len(self.responses)] if self.responses else []
+            self._next += 1
+            self._started_at = time.monotonic()
+
+    def _regenerate(self) -> bool:
+        # The new reply takes the place of the last one, like the page's regenerate action.
+        with self._lock:
+            if self._started_at is None or not self.responses:
+                return False
+
+            self._frames = self.responses[self._next % len(self.responses)]
+            self._next += 1
+            self._started_at = time.monotonic()
+            return True
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._history = []
+            self._frames = []
+            self._started_at = None
+
+    def _click(self, kind: str) -> None:
+        if kind == "send":
+            if self.is_generating():
+                with self._lock:
+                    # The send button doubles as the stop control while a response is generating.
+                    index = self._frame_index()
+                    self._frames = self._frames[:index + 1] if index >= 0 else []
+                    self._started_at = time.monotonic() - (self._frames[-1][0] + self.tail if self._frames else 0)
+            elif self.input_value or self.attached_file:
+                self._send()
+        elif kind == "new_chat":
+            self._reset()
+        elif kind == "deepthink":
+            self.deepthink = not self.deepthink
+        elif kind == "search":
+            self.search = not self.search
+
+    def _set_value(self, value: str) -> None:
+        # A textarea normalises line breaks on assignment.
+        self.input_value = value.replace("\r\n", "\n").replace("\r", "\n")
+
+    def _toggle(self, r1: bool, search: bool, apply: bool) -> int:
+        differing = 0
+        for kind, wanted in (("deepthink", r1), ("search", search)):
+            if getattr(self, kind) != wanted:
+                differing += 1
+                if apply:
+                    self._click(kind)
+        return differing
+
+    def _attribute(self, kind: str, name: str) -> Optional[str]:
+        if kind == "send" and name == "aria-disabled":
+            return "false" if self.is_generating() or self.input_value or self.attached_file else "true"
+        if kind == "input" and name == "value":
+            return self.input_value
+        if kind == "sidebar" and name == "class":
+            return "dc04ec1d a02af2e6"
+        if kind in ("deepthink", "search") and name == "style":
+            return "background: rgba(77, 107, 254, 0.40);" if getattr(self, kind) else ""
+        if kind.startswith("message:") and name == "innerHTML":
+            messages = self._messages()
+            index = int(kind.split(":", 1)[1])
+            return messages[index] if index < len(messages) else ""
+        return ""
+
+    def _kind(self, selector: str) -> Optional[str]:
+        if "_480132b" in selector:
+            return "stop" if self.is_generating() else None
+        if "_7436101" in selector:
+            return "send"
+        if "_217e214" in selector:
+            return "new_chat"
+        if "dc04ec1d" in selector:
+            return "sidebar"
+        if "_3172d9f" in selector:
+            return "search" if "not(" in selector else "deepthink"
+        if selector == "chat-input":
+            return "input"
+        if "type='file'" in selector:
+            return "file"
+        return None
+
+    # =========================================================================================================================
+    # Driver API
+    # =========================================================================================================================
+
+    def get_current_url(self) -> str:
+        self._command("getCurrentUrl")
+        return self.url
+
+    def find_element(self, by: str, selector: str) -> ReplayElement:
+        self._command("findElement")
+        kind = self._kind(selector)
+        if not kind:
+            raise Exception(f"No such element: {selector}")
+        return ReplayElement(self, kind)
+
+    def find_elements(self, by: str, selector: str) -> List[ReplayElement]:
+        self._command("findElements")
+        if "ds-markdown" in selector:
+            return [ReplayElement(self, f"message:{index}") for index in range(len(self._messages()))]
+        kind = self._kind(selector)
+        return [ReplayElement(self, kind)] if kind else []
+
+    def wait_for_element_present(self, selector: str, by: str = "css selector", timeout: float = 10) -> ReplayElement:
+        deadline = time.monotonic() + timeout
+        while True:
+            self._command("findElement")
+            kind = self._kind(selector)
+            if kind:
+                return ReplayElement(self, kind)
+            if time.monotonic() >= deadline:
+                raise Exception(f"Element {selector} was not present after {timeout} seconds.")
+            time.sleep(0.02)
+
+    def click(self, selector: str, **kwargs) -> None:
+        self._command("clickElement")
+
+    def type(self, selector: str, text: str, **kwargs) -> None:
+        self._command("sendKeysToElement")
+
+    def refresh(self) -> None:
+        self._command("refresh")
+
+    def quit(self) -> None:
+        self._command("quit")
+
+    def _read_state(self, mode: str, first: int, second: int) -> dict:
+        messages = self._messages()
+        state = {"generating": self.is_generating(), "count": len(messages)}
+        if not messages:
+            return state
+
+        message = messages[-1]
+        if mode == "text":
+            text = html_converter.html_to_text(message)
+            previous = self._previous_text
+            state["append"] = first > 0 and previous is not None and len(previous.encode("utf-16-le")) // 2 == first and text.startswith(previous)
+            state["text"] = text[len(previous):] if state["append"] else text
+            self._previous_text = text
+            return state
+
+        nodes = split_nodes(message)
+        offset = min(first, len(nodes))
+        if sum(len(node.encode("utf-16-le")) // 2 for node in nodes[:offset]) != second:
+            offset = 0
+
+        state["offset"] = offset
+        state["blocks"] = nodes[offset:]
+        return state
+
+    def execute_script(self, script: str, *args):
+        self._command("executeScript")
+        if script == "arguments[0].click();" and isinstance(args[0], ReplayElement):
+            self._click(args[0].kind)
+        elif script == "arguments[0].value = arguments[1];":
+            self._set_value(args[1])
+        elif script == deepseek._POLL_SCRIPT:
+            return self._read_state(args[1], args[2], args[3])
+        elif script == deepseek._OBSERVER_SCRIPT:
+            self._observed = None
+            return True
+        elif script == deepseek._OBSERVER_STOP_SCRIPT:
+            self._observed = None
+        elif script == deepseek._REGENERATE_SCRIPT:
+            return self._regenerate()
+        elif script == deepseek._TOGGLE_SCRIPT:
+            return self._toggle(*args)
+        elif script == deepseek._STAGE_CHUNK_SCRIPT:
+            self._staged = ([] if args[1] else self._staged) + [args[0]]
+        elif script == deepseek._SET_INPUT_SCRIPT:
+            self._set_value(args[1] if args[1] is not None else "".join(self._staged))
+        elif script == deepseek._ATTACH_FILE_SCRIPT:
+            self.attached_file = args[1] if args[1] is not None else "".join(self._staged)
+            return len(deepseek.page_utf8(self.attached_file))
+        elif script == deepseek._ATTACHMENT_TAKEN_SCRIPT:
+            return bool(self.attached_file)
+        return None
+
+    def execute_async_script(self, script: str, *args):
+        self._command("executeAsyncScript")
+        if script == deepseek._INPUT_DIGEST_SCRIPT:
+            value = self.input_value or ""
+            return [deepseek.utf16_length(value), hashlib.sha256(deepseek.page_utf8(value)).hexdigest()]
+        if script != deepseek._OBSERVER_WAIT_SCRIPT:
+            return None
+
+        timeout, _, mode, first, second = args
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            with self._lock:
+                current = (self._frame_index(), len(self._history))
+            generating = self.is_generating()
+            if (current, generating) != self._observed or not generating or time.monotonic() >= deadline:
+                self._observed = (current, generating)
+                return self._read_state(mode, first, second)
+            time.sleep(0.005)
@@ -2,22 +2,34 @@ from flask import Flask, jsonify, request, Response
 import utils.response_utils as response_utils
 import utils.webdriver_utils as selenium
 import utils.deepseek_driver as deepseek
+import utils.session_pool as session_pool
+import utils.response_cache as response_cache
+import utils.request_coalescer as request_coalescer
+import utils.metrics as metrics
+import utils.generation_recorder as generation_recorder
+import utils.conversation as conversation
 import socket, time, threading
-from typing import Generator
+from seleniumbase import Driver
+from typing import Callable, Generator, Optional
 from waitress import serve
 
 app = Flask(__name__)
-driver = None
+pool = session_pool.SessionPool()
+cache = response_cache.ResponseCache()
+coalescer = request_coalescer.RequestCoalescer()
 last_driver = 0
 last_response = 0
+response_lock = threading.Lock()
 textbox = None
 config = {}
 logging_manager = None
 
+KEEP_ALIVE_INTERVAL = 5
+
 @app.route("/models", methods=["GET"])
 def model() -> Response:
-    global driver
-    if not driver:
+    global pool
+    if not pool.is_active():
         return jsonify({}), 503
 
     show_message("\n[color:purple]API CONNECTION:")
@@ -29,9 +41,15 @@ def model() -> Response:
         print(f"Error connecting to API: {e}")
         return jsonify({}), 500
 
+@app.route("/metrics", methods=["GET"])
+def metrics_report() -> Response:
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route("/chat/completions", methods=["POST"])
 def bot_response() -> Response:
-    global driver, config, last_response
+    global pool, cache, coalescer, config, last_response
+    generation = None
+    received_at = time.perf_counter()
     try:
         data = request.get_json()
         if not data:
@@ -42,172 +60,492 @@ def bot_response() -> Response:
         streaming = response_utils.get_streaming(data)
 
         deepseek_cfg = config.get("models", {}).get("deepseek", {})
-        deepthink = response_utils.get_deepseek_deepthink(data) or deepseek_cfg.get("deepthink", False)
-        search = response_utils.get_deepseek_search(data) or deepseek_cfg.get("search", False)
-        text_file = deepseek_cfg.get("text_file", False)
+        options = {
+            "deepthink": response_utils.get_deepseek_deepthink(data) or deepseek_cfg.get("deepthink", False),
+            "search": response_utils.get_deepseek_search(data) or deepseek_cfg.get("search", False),
+            "text_file": deepseek_cfg.get("text_file", False),
+            "adaptive_upload": deepseek_cfg.get("adaptive_upload", False),
+            "event_streaming": deepseek_cfg.get("event_streaming", False),
+            "page_extraction": deepseek_cfg.get("page_extraction", False),
+            "record": config.get("api", {}).get("record_generations", False),
+            "continuation": config.get("api", {}).get("continue_conversations", False),
+            "fast_swipes": config.get("api", {}).get("regenerate_swipes", False),
+            "prewarm": config.get("api", {}).get("prewarm_chats", False),
+            "limits": config.get("api", {}).get("enforce_limits", False),
+            "retry_window": config.get("api", {}).get("cache_retry_window", 5),
+            "max_tokens": response_utils.get_max_tokens(data),
+            "stop": response_utils.get_stop_sequences(data),
+            "received_at": received_at
+        }
 
         if not character_info:
             print("Error: Data could not be processed.")
             return jsonify({}), 503
-        if not driver:
+        if not pool.is_active():
             print("Error: Selenium is not active.")
             return jsonify({}), 503
 
-        last_response += 1
-        current_message = last_response
+        # The id identifies the request in the queue and as a session's owner, so two requests must never share one.
+        with response_lock:
+            last_response += 1
+            current_message = last_response
 
         show_message(f"\n[color:purple]GENERATING RESPONSE {current_message}:")
         show_message("[color:white]- [color:green]Character data has been received.")
+
+        messages = data.get("messages", [])
+        options["request_keys"] = conversation.message_keys(messages)
+
+        # A swipe repeats the request behind a session's latest reply byte for byte, and asks for a
+        # different reply, so neither the cache nor an identical request in progress may answer it.
+        # Only a repeat sent within the retry window is taken as a client retrying, which the cache answers.
+        now = time.monotonic()
+        swipe = any(s.last_request == options["request_keys"] and now - s.last_reply_at > options["retry_window"] for s in pool.sessions())
+
+        limits = [options["max_tokens"], options["stop"]] if options["limits"] else None
+        key = response_cache.make_key(character_info, options["deepthink"], options["search"], options["text_file"], limits)
+        cached = None if swipe else cache.get(key)
+        if cached is not None:
+            show_message("[color:white]- [color:green]Served from cache.")
+            metrics.REQUESTS.inc("cached")
+            return response_utils.create_response(cached, streaming)
+
+        disconnect_checker = request.environ.get('waitress.client_disconnected')
+        generation, leader = coalescer.begin(key, shared=not swipe)
+        if not leader:
+            show_message("[color:white]- [color:cyan]Joined an identical request in progress.")
+            metrics.REQUESTS.inc("coalesced")
+            return follow_response(generation, streaming, disconnect_checker)
+
+        queued = pool.queue_length()
+        if queued:
+            show_message(f"[color:white]- [color:yellow]Waiting in queue ({queued} ahead).")
+
+        def prefer(s: session_pool.BrowserSession) -> bool:
+            # Requests that extend or regenerate a chat a session already holds should land on that session.
+            if options["fast_swipes"] and conversation.is_regeneration(s.conversation, options["request_keys"]):
+                return True
+            return options["continuation"] and conversation.continuation_start(s.conversation, messages) is not None
+
+        try:
+            waiting_since = time.perf_counter()
+            session = pool.lease(current_message, disconnect_checker, prefer)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - waiting_since, "queue_wait")
+        except session_pool.QueueFullError as e:
+            show_message("[color:white]- [color:red]Request queue is full.")
+            metrics.REQUESTS.inc("queue_full")
+            coalescer.end(generation, "")
+            return jsonify({}), 429, {"Retry-After": str(e.retry_after)}
+        except session_pool.QueueTimeoutError as e:
+            show_message("[color:white]- [color:red]Timed out waiting in queue.")
+            metrics.REQUESTS.inc("queue_timeout")
+            coalescer.end(generation, "")
+            return jsonify({}), 503, {"Retry-After": str(e.retry_after)}
+        except session_pool.QueueCancelledError:
+            show_message("[color:white]- [color:yellow]Client disconnected while waiting in queue.")
+            metrics.REQUESTS.inc("interrupted")
+            coalescer.end(generation, "")
+            return jsonify({}), 503
+
+        if not session:
+            print("Error: No browser session available.")
+            metrics.REQUESTS.inc("no_session")
+            coalescer.end(generation, "")
+            return jsonify({}), 503
+
+        if pool.size() > 1:
+            show_message(f"[color:white]- [color:cyan]Using browser session {session.index}.")
+
+        prompt = character_info
+        options["fresh"] = True
+        options["regenerate"] = options["fast_swipes"] and conversation.is_regeneration(session.conversation, options["request_keys"])
+        if options["continuation"] and not options["regenerate"]:
+            start = conversation.continuation_start(session.conversation, messages)
+            continued = response_utils.format_continuation(data, start) if start else None
+            if continued:
+                prompt = continued
+                options["fresh"] = False
+                show_message(f"[color:white]- [color:cyan]Continuing conversation ({len(messages) - start} new messages).")
         
-        return deepseek_response(current_message, character_info, streaming, deepthink, search, text_file)
+        return deepseek_response(session, current_message, prompt, streaming, options, generation)
     except Exception as e:
         print(f"Error receiving JSON from Sillytavern: {e}")
+        metrics.REQUESTS.inc("error")
+        if generation:
+            coalescer.end(generation, "")
         return jsonify({}), 500
 
-def deepseek_response(current_id: int, character_info: dict, streaming: bool, deepthink: bool, search: bool, text_file: bool) -> Response:
-    global driver, last_response
+def follow_response(generation: request_coalescer.Generation, streaming: bool, disconnect_checker) -> Response:
+    if streaming:
+        def streaming_response() -> Generator[str, None, None]:
+            yield response_utils.create_response_role()
+            for chunk in generation.stream(disconnect_checker, KEEP_ALIVE_INTERVAL):
+                yield response_utils.create_response_streaming(chunk) if chunk else response_utils.create_keep_alive()
+
+        # The slot is given back when the response closes, which also covers a stream closed before its first chunk.
+        response = Response(streaming_response(), content_type="text/event-stream")
+        response.call_on_close(generation.leave)
+        return response
+
+    try:
+        return response_utils.create_response_jsonify(generation.wait(disconnect_checker) or "")
+    finally:
+        generation.leave()
+
+def deepseek_response(session: session_pool.BrowserSession, current_id: int, character_info: dict, streaming: bool, options: dict, generation: request_coalescer.Generation) -> Response:
+    global pool, cache, coalescer
+    driver = session.driver
+    result = ""
+    completed = False
+    last_text = ""
+    webdriver_calls = metrics.webdriver_calls(driver)
+    generating_at = first_delta_at = None
+    recorder = None
+    skip = 0
+    cancelled = False
+    limits = None
+    if options["limits"] and (options["max_tokens"] or options["stop"]):
+        limits = response_utils.OutputLimits(options["max_tokens"], options["stop"])
+
+    # Read while the request context exists; the streaming generator runs after it is gone.
+    disconnect_checker = request.environ.get('waitress.client_disconnected')
 
     def client_disconnected() -> bool:
-        if not streaming:
-            disconnect_checker = request.environ.get('waitress.client_disconnected')
-            return disconnect_checker and disconnect_checker()
-        return False
+        return bool(disconnect_checker and disconnect_checker())
     
     def interrupted() -> bool:
-        return current_id != last_response or driver is None or client_disconnected()
+        # Requests that joined this generation still need it after the original client leaves.
+        return cancelled or not session.owned_by(current_id) or (client_disconnected() and not generation.has_followers())
+
+    def respond(text: str) -> Response:
+        nonlocal result
+        result = text
+        return response_utils.create_response(text, streaming)
+
+    def abandon() -> None:
+        # Stopping frees DeepSeek at once; the new chat then discards the partial reply.
+        if session.owned_by(current_id):
+            deepseek.stop_generation(driver)
+            # The reply may already have been recorded, but the chat that held it is gone.
+            session.conversation = None
+        deepseek.new_chat(driver)
 
     def safe_interrupt_response() -> Response:
-        deepseek.new_chat(driver)
-        return response_utils.create_response("", streaming)
+        abandon()
+        return respond("")
+
+    def timed(stage: str, action: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return action(*args)
+        finally:
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+    def advance(new_text: str) -> Optional[str]:
+        nonlocal last_text, first_delta_at
+        # Text already sent cannot be taken back, so only a strict extension of it goes out.
+        if new_text and len(new_text) > len(last_text) and new_text.startswith(last_text):
+            diff = new_text[len(last_text):]
+            last_text = new_text
+            if first_delta_at is None:
+                first_delta_at = time.perf_counter()
+                metrics.STAGE_SECONDS.observe(first_delta_at - options["received_at"], "first_delta")
+            generation.publish(diff)
+            return diff
+        return None
+
+    def collect() -> Generator[str, None, None]:
+        raw_text = None
+        for new_text in deepseek.stream_last_message(driver, options["event_streaming"], options["page_extraction"], recorder=recorder, skip=skip):
+            if interrupted():
+                return
+
+            if not new_text:
+                yield ""
+                continue
+
+            raw_text = new_text
+            visible = limits.update(new_text) if limits else new_text
+            diff = advance(visible if limits and limits.reason else deepseek.stable_prefix(visible))
+            yield diff or ""
+
+            if limits and limits.reason:
+                show_message(f"[color:white]- [color:yellow]Stopped at {'max tokens' if limits.reason == 'length' else 'a stop sequence'}.")
+                deepseek.stop_generation(driver)
+                return
+
+        # Generation has ended, so text held back as unsettled or as a possible stop sequence is final.
+        if raw_text:
+            diff = advance(limits.update(raw_text, final=True) if limits else raw_text)
+            if diff:
+                yield diff
+            if limits and limits.reason:
+                deepseek.stop_generation(driver)
+
+    def complete() -> str:
+        nonlocal result, completed
+        closing = deepseek.get_closing_symbol(last_text) if last_text else "Error receiving response."
+        generation.publish(closing)
+        result = last_text + closing if last_text else closing
+        if last_text:
+            completed = True
+            cache.put(generation.key, result)
+            # Kept apart from the conversation, which prewarming and new requests clear, so swipes are still recognised.
+            session.last_request = options["request_keys"]
+            session.last_reply_at = time.monotonic()
+            # A cut reply no longer matches what the DeepSeek chat holds, so it cannot be continued.
+            if not (limits and limits.reason):
+                session.conversation = conversation.Conversation(options["request_keys"], result)
+            elapsed = time.perf_counter() - generating_at
+            if elapsed > 0:
+                metrics.CHARS_PER_SECOND.observe(len(last_text) / elapsed)
+        show_message("[color:white]- [color:green]Completed.")
+        return closing
+
+    def prewarm() -> None:
+        # The session stays leased until the next chat is ready, so no request can race the setup.
+        try:
+            timed("prewarm", deepseek.configure_chat, driver, options["deepthink"], options["search"], True)
+            session.conversation = None
+            session.prepared = (options["deepthink"], options["search"])
+        except Exception as e:
+            print(f"Error preparing the next chat: {e}")
+        finally:
+            pool.release(session, current_id)
+
+    def finish_reason() -> str:
+        return "length" if limits and limits.reason == "length" else "stop"
+
+    def finish() -> None:
+        if recorder:
+            recorder.close()
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - options["received_at"], "total")
+        metrics.WEBDRIVER_CALLS.observe(metrics.webdriver_calls(driver) - webdriver_calls)
+        metrics.REQUESTS.inc("completed" if completed else (result or "interrupted"))
+        coalescer.end(generation, result)
+
+        # Continuation and in-place swipes both need the chat that was just completed.
+        if completed and options["prewarm"] and not options["continuation"] and not options["fast_swipes"]:
+            threading.Thread(target=prewarm, daemon=True).start()
+        else:
+            pool.release(session, current_id)
 
-    try:
+    def prepare() -> Optional[str]:
+        # Returns None once DeepSeek is generating, otherwise the text to answer with.
+        nonlocal skip, generating_at, recorder
         if not selenium.current_page(driver, "https://chat.deepseek.com"):
             show_message("[color:white]- [color:red]You must be on the DeepSeek website.")
-            return response_utils.create_response("You must be on the DeepSeek website.", streaming)
+            return "You must be on the DeepSeek website."
 
         if selenium.current_page(driver, "https://chat.deepseek.com/sign_in"):
             show_message("[color:white]- [color:red]You must be logged into DeepSeek.")
-            return response_utils.create_response("You must be logged into DeepSeek.", streaming)
+            return "You must be logged into DeepSeek."
 
         if interrupted():
-            return safe_interrupt_response()
+            abandon()
+            return ""
+
+        # Whatever the chat held is about to change; it is only known again once this response completes.
+        session.conversation = None
+        prepared, session.prepared = session.prepared, None
+        regenerated = False
+        if options["regenerate"]:
+            # The regenerated reply replaces the last message instead of adding one.
+            skip = deepseek.message_count(driver) - 1
+            regenerated = timed("regenerate", deepseek.regenerate_response, driver)
+            if regenerated:
+                show_message("[color:white]- [color:green]Regenerating the last response.")
+            else:
+                skip = 0
+                show_message("[color:white]- [color:yellow]Could not regenerate, sending the full prompt.")
+
+        if not regenerated:
+            if options["fresh"] and prepared == (options["deepthink"], options["search"]):
+                show_message("[color:white]- [color:cyan]Using the chat prepared in advance.")
+            else:
+                timed("configure_chat", deepseek.configure_chat, driver, options["deepthink"], options["search"], options["fresh"])
+                show_message("[color:white]- [color:cyan]Chat reset and configured." if options["fresh"] else "[color:white]- [color:cyan]Chat configured.")
 
-        deepseek.configure_chat(driver, deepthink, search)
-        show_message("[color:white]- [color:cyan]Chat reset and configured.")
+            if interrupted():
+                abandon()
+                return ""
 
-        if interrupted():
-            return safe_interrupt_response()
+            if not options["fresh"]:
+                skip = deepseek.message_count(driver)
 
-        if not deepseek.send_chat_message(driver, character_info, text_file):
-            show_message("[color:white]- [color:red]Could not paste prompt.")
-            return response_utils.create_response("Could not paste prompt.", streaming)
+            if not timed("send_chat_message", deepseek.send_chat_message, driver, character_info, options["text_file"], options["adaptive_upload"]):
+                show_message("[color:white]- [color:red]Could not paste prompt.")
+                return "Could not paste prompt."
 
-        show_message("[color:white]- [color:green]Prompt pasted and sent.")
+            show_message("[color:white]- [color:green]Prompt pasted and sent.")
 
         if interrupted():
-            return safe_interrupt_response()
+            abandon()
+            return ""
 
-        if not deepseek.active_generate_response(driver):
+        if not timed("active_generation", deepseek.active_generate_response, driver):
             show_message("[color:white]- [color:red]No response generated.")
-            return response_utils.create_response("No response generated.", streaming)
+            return "No response generated."
 
         if interrupted():
-            return safe_interrupt_response()
+            abandon()
+            return ""
 
         show_message("[color:white]- [color:cyan]Awaiting response.")
-        initial_text = ""
-        last_text = ""
-
-        if streaming:
-            def streaming_response() -> Generator[str, None, None]:
-                nonlocal initial_text, last_text
-                try:
-                    while deepseek.is_response_generating(driver):
-                        if interrupted():
-                            break
-
-                        new_text = deepseek.get_last_message(driver)
-                        if new_text and not initial_text:
-                            initial_text = new_text
-                        
-                        if new_text and new_text != last_text and new_text.startswith(initial_text):
-                            diff = new_text[len(last_text):]
-                            last_text = new_text
-                            yield response_utils.create_response_streaming(diff)
-                        
-                        time.sleep(0.2)
-
-                    if interrupted():
-                        return safe_interrupt_response()
-
-                    closing = deepseek.get_closing_symbol(last_text) if last_text else "Error receiving response."
-                    yield response_utils.create_response_streaming(closing)
-                    show_message("[color:white]- [color:green]Completed.")
-                except GeneratorExit:
-                    deepseek.new_chat(driver)
-                
-                except Exception as e:
-                    deepseek.new_chat(driver)
-                    print(f"Streaming error: {e}")
-                    show_message("[color:white]- [color:red]Unknown error occurred.")
-                    yield response_utils.create_response_streaming("Error receiving response.")
-            return Response(streaming_response(), content_type="text/event-stream")
-        else:
-            while deepseek.is_response_generating(driver):
-                if interrupted():
-                    break
-                
-                new_text = deepseek.get_last_message(driver)
-                if new_text and not initial_text:
-                    initial_text = new_text
-                
-                if new_text and new_text.startswith(initial_text):
-                    last_text = new_text
-                
-                time.sleep(0.2)
-            
+        generating_at = time.perf_counter()
+        if options["record"]:
+            recorder = generation_recorder.GenerationRecorder(current_id, {
+                "event_streaming": options["event_streaming"],
+                "deepthink": options["deepthink"],
+                "search": options["search"]
+            })
+        return None
+
+    def prepare_safely() -> Optional[str]:
+        try:
+            return prepare()
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            show_message("[color:white]- [color:red]Unknown error occurred.")
+            return "Error receiving response."
+
+    if streaming:
+        setup = None
+
+        def events() -> Generator[str, None, None]:
+            # Headers and the role chunk go out at once; setup runs beside the stream so idle
+            # stretches can be filled with SSE comments that keep proxies from timing out.
+            nonlocal result, setup
+            yield response_utils.create_response_role()
+
+            outcome = []
+            setup = threading.Thread(target=lambda: outcome.append(prepare_safely()), daemon=True)
+            setup.start()
+            while setup.is_alive():
+                setup.join(KEEP_ALIVE_INTERVAL)
+                if setup.is_alive():
+                    yield response_utils.create_keep_alive()
+
+            failure = outcome[0] if outcome else "Error receiving response."
+            if failure is not None:
+                result = failure
+                if failure:
+                    yield response_utils.create_response_streaming(failure)
+                return
+
+            last_write = time.monotonic()
+            for diff in collect():
+                # Long DeepThink phases produce no text, so silence is broken the same way.
+                if diff:
+                    yield response_utils.create_response_streaming(diff)
+                elif time.monotonic() - last_write >= KEEP_ALIVE_INTERVAL:
+                    yield response_utils.create_keep_alive()
+                else:
+                    continue
+                last_write = time.monotonic()
+
             if interrupted():
-                return safe_interrupt_response()
+                abandon()
+                return
+
+            closing = complete()
+            yield response_utils.create_response_streaming(closing, finish_reason())
+
+        def streaming_response() -> Generator[str, None, None]:
+            nonlocal result, cancelled
+            detached = False
+            chunks = events()
+            try:
+                for chunk in chunks:
+                    if detached:
+                        continue
+                    try:
+                        yield chunk
+                    except GeneratorExit:
+                        if not generation.has_followers():
+                            raise
+                        detached = True
+            except GeneratorExit:
+                # The write to the client failed before a disconnect was noticed between ticks.
+                cancelled = True
+                if setup:
+                    setup.join()
+                abandon()
             
-            response = (last_text + deepseek.get_closing_symbol(last_text)) if last_text else "Error receiving response."
-            show_message("[color:white]- [color:green]Completed.")
-            return response_utils.create_response_jsonify(response)
+            except Exception as e:
+                abandon()
+                print(f"Streaming error: {e}")
+                show_message("[color:white]- [color:red]Unknown error occurred.")
+                result = "Error receiving response."
+                generation.publish(result)
+                if not detached:
+                    yield response_utils.create_response_streaming(result)
+            finally:
+                chunks.close()
+                finish()
+
+        return Response(streaming_response(), content_type="text/event-stream")
+
+    try:
+        failure = prepare()
+        if failure is not None:
+            return respond(failure)
+
+        for _ in collect():
+            pass
+        
+        if interrupted():
+            return safe_interrupt_response()
+        
+        complete()
+        return response_utils.create_response_jsonify(result, finish_reason())
     
     except Exception as e:
         print(f"Error generating response: {e}")
         show_message("[color:white]- [color:red]Unknown error occurred.")
-        return response_utils.create_response("Error receiving response.", streaming)
+        return respond("Error receiving response.")
+    finally:
+        finish()
 
 # =============================================================================================================================
 # Selenium Actions
 # =============================================================================================================================
 
 def run_services() -> None:
-    global driver, config, last_driver, last_response
+    global pool, cache, config, last_driver, last_response
     try:
-        last_response = 0
+        with response_lock:
+            last_response = 0
         last_driver += 1
         close_selenium()
 
-        driver = selenium.initialize_webdriver(config.get("browser"), "https://chat.deepseek.com/sign_in")
-        
-        if driver:
-            threading.Thread(target=monitor_driver, daemon=True).start()
+        ds_config = config.get("models", {}).get("deepseek", {})
+        api_config = config.get("api", {})
 
-            ds_config = config.get("models", {}).get("deepseek", {})
+        def prepare_session(driver: Driver) -> None:
+            metrics.instrument_driver(driver)
             if ds_config.get("auto_login"):
                 deepseek.login(driver, ds_config.get("email"), ds_config.get("password"))
 
+        pool.configure(api_config.get("queue_size", 8), api_config.get("queue_timeout", 120))
+        cache.configure(api_config.get("cache_enabled", False), api_config.get("cache_size", 64), api_config.get("cache_ttl", 600), api_config.get("cache_persist", False))
+        started = pool.start(config.get("browser"), "https://chat.deepseek.com/sign_in", api_config.get("browser_sessions", 1), prepare_session)
+        
+        if started:
+            threading.Thread(target=monitor_driver, daemon=True).start()
+
             clear_messages()
             show_message("[color:red]API IS NOW ACTIVE!")
             show_message("[color:cyan]WELCOME TO INTENSE RP API")
+            if started > 1:
+                show_message(f"[color:yellow]Browser sessions: [color:white]{started}")
             show_message("[color:yellow]URL 1: [color:white]http://127.0.0.1:5000/")
 
             if config.get("show_ip"):
                 ip = socket.gethostbyname(socket.gethostname())
                 show_message(f"[color:yellow]URL 2: [color:white]http://{ip}:5000/")
 
-            serve(app, host="0.0.0.0", port=5000, channel_request_lookahead=1)
+            serve(app, host="0.0.0.0", port=5000, channel_request_lookahead=1, threads=started + pool.max_queue + 2)
         else:
             clear_messages()
             show_message("[color:red]Selenium failed to start.")
@@ -215,25 +553,25 @@ def run_services() -> None:
         print(f"Error starting Selenium: {e}")
 
 def monitor_driver() -> None:
-    global driver, last_driver
+    global pool, last_driver
     current = last_driver
     print("Starting browser detection.")
     while current == last_driver:
-        if driver and not selenium.is_browser_open(driver):
+        for session in pool.sessions():
+            if session.driver and not selenium.is_browser_open(session.driver):
+                pool.remove(session)
+                if pool.is_active():
+                    show_message(f"[color:red]Browser session {session.index} connection lost!")
+
+        if not pool.is_active():
             clear_messages()
             show_message("[color:red]Browser connection lost!")
-            driver = None
             break
         time.sleep(2)
 
 def close_selenium() -> None:
-    global driver
-    try:
-        if driver:
-            driver.quit()
-            driver = None
-    except Exception:
-        pass
+    global pool
+    pool.close()
 
 # =============================================================================================================================
 # Textbox Actions
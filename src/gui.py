@@ -1,6 +1,8 @@
 import threading, webbrowser, api, sys, re
 import utils.response_utils as response_utils
 import utils.deepseek_driver as deepseek
+import utils.response_cache as response_cache
+import utils.generation_recorder as generation_recorder
 import utils.storage_manager as storage
 import utils.process_manager as process
 import utils.gui_builder as gui_builder
@@ -32,13 +34,31 @@ original_config = {
             "auto_login": False,
             "text_file": False,
             "deepthink": False,
-            "search": False
+            "search": False,
+            "event_streaming": False,
+            "page_extraction": False,
+            "adaptive_upload": False
         }
     },
     "logging": {
         "enabled": False,
         "max_file_size": 1048576,  # 1MB in bytes
         "max_files": 10
+    },
+    "api": {
+        "browser_sessions": 1,
+        "queue_size": 8,
+        "queue_timeout": 120,
+        "cache_enabled": False,
+        "cache_size": 64,
+        "cache_ttl": 600,
+        "cache_retry_window": 5,
+        "cache_persist": False,
+        "record_generations": False,
+        "continue_conversations": False,
+        "regenerate_swipes": False,
+        "prewarm_chats": False,
+        "enforce_limits": False
     }
 }
 
@@ -172,6 +192,9 @@ def open_config_window() -> None:
         deepseek_frame.create_switch(id="text_file", label_text="Text file:", default_value=deepseek_model["text_file"], row=4, row_grid=True)
         deepseek_frame.create_switch(id="deepthink", label_text="Deepthink:", default_value=deepseek_model["deepthink"], row=5, row_grid=True)
         deepseek_frame.create_switch(id="search", label_text="Search:", default_value=deepseek_model["search"], row=6, row_grid=True)
+        deepseek_frame.create_switch(id="event_streaming", label_text="Event streaming:", default_value=deepseek_model["event_streaming"], row=7, row_grid=True)
+        deepseek_frame.create_switch(id="page_extraction", label_text="In-page extraction:", default_value=deepseek_model["page_extraction"], row=8, row_grid=True)
+        deepseek_frame.create_switch(id="adaptive_upload", label_text="Choose paste or file automatically:", default_value=deepseek_model["adaptive_upload"], row=9, row_grid=True)
         
         # Create Logging Settings section
         logging_config = config["logging"]
@@ -186,6 +209,29 @@ def open_config_window() -> None:
         logging_frame.create_entry(id="max_file_size", label_text="Max file size:", default_value=format_file_size(logging_config["max_file_size"]), row=2, row_grid=True)
         logging_frame.create_entry(id="max_files", label_text="Max files:", default_value=str(logging_config["max_files"]), row=3, row_grid=True)
         
+        # Create API Settings section
+        api_config = config["api"]
+        api_frame = config_window.create_section_frame(
+            id="api_frame",
+            title="API Settings",
+            bg_color=("white", "gray20")
+        )
+
+        api_frame.create_title(id="api_settings", text="API Settings", row=0, row_grid=True)
+        api_frame.create_entry(id="browser_sessions", label_text="Browser sessions:", default_value=str(api_config["browser_sessions"]), row=1, row_grid=True)
+        api_frame.create_entry(id="queue_size", label_text="Max queued requests:", default_value=str(api_config["queue_size"]), row=2, row_grid=True)
+        api_frame.create_entry(id="queue_timeout", label_text="Queue timeout (s):", default_value=str(api_config["queue_timeout"]), row=3, row_grid=True)
+        api_frame.create_switch(id="cache_enabled", label_text="Response cache:", default_value=api_config["cache_enabled"], row=4, row_grid=True)
+        api_frame.create_entry(id="cache_size", label_text="Cache entries:", default_value=str(api_config["cache_size"]), row=5, row_grid=True)
+        api_frame.create_entry(id="cache_ttl", label_text="Cache lifetime (s):", default_value=str(api_config["cache_ttl"]), row=6, row_grid=True)
+        api_frame.create_entry(id="cache_retry_window", label_text="Cache repeats of last reply for (s):", default_value=str(api_config["cache_retry_window"]), row=7, row_grid=True)
+        api_frame.create_switch(id="cache_persist", label_text="Keep cache on disk:", default_value=api_config["cache_persist"], row=8, row_grid=True)
+        api_frame.create_switch(id="record_generations", label_text="Record generations:", default_value=api_config["record_generations"], row=9, row_grid=True)
+        api_frame.create_switch(id="continue_conversations", label_text="Continue conversations:", default_value=api_config["continue_conversations"], row=10, row_grid=True)
+        api_frame.create_switch(id="regenerate_swipes", label_text="Regenerate swipes in place:", default_value=api_config["regenerate_swipes"], row=11, row_grid=True)
+        api_frame.create_switch(id="prewarm_chats", label_text="Prepare next chat in advance:", default_value=api_config["prewarm_chats"], row=12, row_grid=True)
+        api_frame.create_switch(id="enforce_limits", label_text="Respect max tokens and stop strings:", default_value=api_config["enforce_limits"], row=13, row_grid=True)
+        
         # Create Advanced Settings section
         advanced_frame = config_window.create_section_frame(
             id="advanced_frame",
@@ -207,7 +253,7 @@ def open_config_window() -> None:
         save_button = gui_builder.ctk.CTkButton(
             button_container, 
             text="Save", 
-            command=lambda: save_config(config_window, deepseek_frame, logging_frame, advanced_frame),
+            command=lambda: save_config(config_window, deepseek_frame, logging_frame, api_frame, advanced_frame),
             width=80
         )
         save_button.grid(row=0, column=0, padx=5, pady=5, sticky="e")
@@ -231,6 +277,7 @@ def save_config(
         config_window: gui_builder.ConfigWindow,
         deepseek_frame: gui_builder.ConfigFrame,
         logging_frame: gui_builder.ConfigFrame,
+        api_frame: gui_builder.ConfigFrame,
         advanced_frame: gui_builder.ConfigFrame
     ) -> None:
     try:
@@ -249,6 +296,15 @@ def save_config(
         def set_entry_style(entry, valid: bool) -> None:
             entry.configure(border_color="gray" if valid else "red")
         
+        def parse_int_entry(entry, min_value: int, max_value: int) -> int | None:
+            try:
+                value = int(entry.get().strip())
+                valid = min_value <= value <= max_value
+            except ValueError:
+                value, valid = None, False
+            set_entry_style(entry, valid)
+            return value if valid else None
+        
         # Validate email/password if auto_login is enabled
         if auto_login:
             valid_email = is_valid_email(email_entry.get())
@@ -283,6 +339,16 @@ def save_config(
             set_entry_style(max_files_entry, False)
             return
 
+        # Validate API settings
+        browser_sessions = parse_int_entry(api_frame.get_widget("browser_sessions"), 1, 8)
+        queue_size = parse_int_entry(api_frame.get_widget("queue_size"), 0, 100)
+        queue_timeout = parse_int_entry(api_frame.get_widget("queue_timeout"), 1, 3600)
+        cache_size = parse_int_entry(api_frame.get_widget("cache_size"), 1, 10000)
+        cache_ttl = parse_int_entry(api_frame.get_widget("cache_ttl"), 1, 604800)
+        cache_retry_window = parse_int_entry(api_frame.get_widget("cache_retry_window"), 0, 600)
+        if None in (browser_sessions, queue_size, queue_timeout, cache_size, cache_ttl, cache_retry_window):
+            return
+
         # Save configuration
         config["browser"] = advanced_frame.get_widget_value("browser")
         config["check_version"] = advanced_frame.get_widget_value("check_version")
@@ -297,6 +363,20 @@ def save_config(
         config["logging"]["max_file_size"] = max_file_size_bytes
         config["logging"]["max_files"] = max_files_int
         
+        config["api"]["browser_sessions"] = browser_sessions
+        config["api"]["queue_size"] = queue_size
+        config["api"]["queue_timeout"] = queue_timeout
+        config["api"]["cache_enabled"] = api_frame.get_widget_value("cache_enabled")
+        config["api"]["cache_size"] = cache_size
+        config["api"]["cache_ttl"] = cache_ttl
+        config["api"]["cache_retry_window"] = cache_retry_window
+        config["api"]["cache_persist"] = api_frame.get_widget_value("cache_persist")
+        config["api"]["record_generations"] = api_frame.get_widget_value("record_generations")
+        config["api"]["continue_conversations"] = api_frame.get_widget_value("continue_conversations")
+        config["api"]["regenerate_swipes"] = api_frame.get_widget_value("regenerate_swipes")
+        config["api"]["prewarm_chats"] = api_frame.get_widget_value("prewarm_chats")
+        config["api"]["enforce_limits"] = api_frame.get_widget_value("enforce_limits")
+        
         storage_manager.save_config(path_root="executable", sub_path="save", new=config, original=original_config)
         api.config = config
         
@@ -392,6 +472,8 @@ def create_gui() -> None:
         icon_path = storage_manager.get_existing_path(path_root="base", relative_path="icon.ico")
 
         deepseek.manager = storage_manager
+        response_cache.manager = storage_manager
+        generation_recorder.manager = storage_manager
         response_utils.__version__ = __version__
         
         gui_builder.apply_appearance()
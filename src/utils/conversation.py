@@ -0,0 +1,51 @@
+from typing import List, Optional, Tuple
+
+# =============================================================================================================================
+# Conversation State
+# =============================================================================================================================
+
+class Conversation:
+    """What a browser session's current DeepSeek chat has already seen."""
+
+    def __init__(self, request: List[Tuple[str, str]], reply: str):
+        self.request = request
+        self.messages = sent_prefix(request)
+        self.reply = reply
+
+def message_key(message: dict) -> Tuple[str, str]:
+    return (str(message.get("role", "")), str(message.get("content", "")))
+
+def message_keys(messages: list) -> List[Tuple[str, str]]:
+    return [message_key(message) for message in messages]
+
+def sent_prefix(keys: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    # Trailing system messages are per-turn instructions that SillyTavern moves to the end of
+    # every request, so they are never part of the history a later request has to repeat.
+    end = len(keys)
+    while end and keys[end - 1][0] == "system":
+        end -= 1
+    return keys[:end]
+
+def continuation_start(conversation: Optional[Conversation], messages: list) -> Optional[int]:
+    # Index of the first message the chat has not seen, or None when the history diverged.
+    if not conversation or not conversation.messages:
+        return None
+
+    sent = len(conversation.messages)
+    if len(messages) <= sent + 1:
+        return None
+
+    if [message_key(message) for message in messages[:sent]] != conversation.messages:
+        return None
+
+    role, content = message_key(messages[sent])
+    if role != "assistant" or content.strip() != conversation.reply.strip():
+        return None
+
+    if not any(message.get("role") == "user" for message in messages[sent + 1:]):
+        return None
+    return sent + 1
+
+def is_regeneration(conversation: Optional[Conversation], keys: List[Tuple[str, str]]) -> bool:
+    # A swipe repeats the request that produced the chat's last reply, without that reply.
+    return bool(conversation and conversation.request and keys == conversation.request)
@@ -1,8 +1,9 @@
 from selenium.webdriver.common.keys import Keys
 from seleniumbase import Driver
-from bs4 import BeautifulSoup
-from typing import Optional
-import re, time
+from typing import Generator, Optional
+from utils.wait_engine import wait_for
+import utils.html_converter as html_converter
+import hashlib, re, time
 
 manager = None
 
@@ -25,13 +26,17 @@ def login(driver: Driver, email: str, password: str) -> None:
 # Reset and configure chat
 # =============================================================================================================================
 
+def _sidebar_closed(driver: Driver) -> bool:
+    return "a02af2e6" in (driver.find_element("class name", "dc04ec1d").get_attribute("class") or "")
+
+def _chat_input_present(driver: Driver) -> bool:
+    return bool(driver.find_elements("id", "chat-input"))
+
 def _close_sidebar(driver: Driver) -> None:
     try:
-        sidebar = driver.find_element("class name", "dc04ec1d")
-        
-        if "a02af2e6" not in sidebar.get_attribute("class"):
+        if not _sidebar_closed(driver):
             driver.click(".ds-icon-button")
-            time.sleep(1)
+            wait_for("close_sidebar", lambda: _sidebar_closed(driver), timeout=2)
     except Exception:
         pass
 
@@ -42,38 +47,81 @@ def new_chat(driver: Driver) -> None:
     except Exception:
         pass
 
-def _check_and_reload_page(driver: Driver) -> None:
+def _check_and_reload_page(driver: Driver) -> bool:
     try:
         element = driver.find_elements("css selector", "div.a4380d7b")
         
         if element:
             driver.refresh()
-            time.sleep(1)
+            wait_for("reload_page", lambda: _chat_input_present(driver), timeout=15)
+            return True
     except Exception:
         pass
+    return False
 
 def _set_button_state(driver: Driver, xpath: str, activate: bool) -> None:
     try:
         button = driver.find_element("xpath", xpath)
-        style = button.get_attribute("style")
-        is_active = "rgba(77, 107, 254, 0.40)" in style
+        is_active = lambda: "rgba(77, 107, 254, 0.40)" in (button.get_attribute("style") or "")
         
-        if is_active != activate:
+        if is_active() != activate:
             driver.execute_script("arguments[0].click();", button)
-            time.sleep(0.5)
+            wait_for("toggle_button", lambda: is_active() == activate, timeout=2)
     except Exception as e:
         print(f"Error setting button state: {e}")
 
-def configure_chat(driver: Driver, r1: bool, search: bool) -> None:
+_TOGGLE_SCRIPT = """
+const [r1, search, apply] = arguments;
+const buttons = Array.from(document.querySelectorAll("div[role='button'][class*='_3172d9f']"));
+const deepthink = buttons.find((button) => button.textContent.includes("R1"));
+const web = buttons.find((button) => !button.textContent.includes("R1"));
+if (!deepthink || !web) return null;
+
+// Returns how many toggles differ from the requested state, clicking them when asked to.
+let differing = 0;
+for (const [button, wanted] of [[deepthink, r1], [web, search]]) {
+    const active = (button.getAttribute("style") || "").includes("rgba(77, 107, 254, 0.40)");
+    if (active !== wanted) {
+        differing++;
+        if (apply) button.click();
+    }
+}
+return differing;
+"""
+
+def _apply_toggles(driver: Driver, r1: bool, search: bool) -> Optional[bool]:
+    # None means the buttons were not found by the script and the per-button path should run.
+    try:
+        differing = driver.execute_script(_TOGGLE_SCRIPT, r1, search, True)
+        if differing is None:
+            return None
+        if not differing:
+            return True
+        
+        return bool(wait_for("toggle_button", lambda: driver.execute_script(_TOGGLE_SCRIPT, r1, search, False) == 0, timeout=2))
+    except Exception as e:
+        print(f"Error setting button state: {e}")
+        return False
+
+def configure_chat(driver: Driver, r1: bool, search: bool, fresh: bool = True) -> None:
     global manager
     if manager.get_temp_files():
         manager.delete_file("temp", manager.get_last_temp_file())
     
     _close_sidebar(driver)
-    new_chat(driver)
-    _check_and_reload_page(driver)
-    _set_button_state(driver, "//div[@role='button' and contains(@class, '_3172d9f') and contains(., 'R1')]", r1)
-    _set_button_state(driver, "//div[@role='button' and contains(@class, '_3172d9f') and not(contains(., 'R1'))]", search)
+    if fresh:
+        new_chat(driver)
+    reloaded = _check_and_reload_page(driver)
+    
+    # Within one chat nothing but this function touches the toggles, so the state applied last time still holds.
+    if not fresh and not reloaded and getattr(driver, "_intense_toggles", None) == (r1, search):
+        return
+    
+    applied = _apply_toggles(driver, r1, search)
+    if applied is None:
+        _set_button_state(driver, "//div[@role='button' and contains(@class, '_3172d9f') and contains(., 'R1')]", r1)
+        _set_button_state(driver, "//div[@role='button' and contains(@class, '_3172d9f') and not(contains(., 'R1'))]", search)
+    driver._intense_toggles = (r1, search) if applied else None
 
 # =============================================================================================================================
 # Send message or upload file to chat
@@ -84,64 +132,233 @@ def _click_send_message_button(driver: Driver) -> bool:
         button_xpath = "//div[@role='button' and contains(@class, '_7436101')]"
         driver.wait_for_element_present(button_xpath, by="xpath", timeout=15)
         
-        end_time = time.time() + 60
-        while time.time() < end_time:
+        def enabled_button():
             button = driver.find_element("xpath", button_xpath)
-            if button.get_attribute("aria-disabled") == "false":
-                driver.execute_script("arguments[0].click();", button)
-                return True
-            
-            time.sleep(1)
+            return button if button.get_attribute("aria-disabled") == "false" else None
         
-        return False
+        # Attachments keep the button disabled while they upload, so this step gets a long timeout.
+        button = wait_for("send_button_enabled", enabled_button, timeout=60, interval=0.1)
+        if not button:
+            return False
+        
+        driver.execute_script("arguments[0].click();", button)
+        return True
     except Exception as e:
         print(f"Error clicking the send message button: {e}")
         return False
 
+_INPUT_CHUNK_SIZE = 262144
+
+_STAGE_CHUNK_SCRIPT = """
+const [chunk, first] = arguments;
+if (first) window.__intenseText = [];
+window.__intenseText.push(chunk);
+"""
+
+_SET_INPUT_SCRIPT = """
+const [input, inline] = arguments;
+input.value = inline ?? window.__intenseText.join("");
+delete window.__intenseText;
+"""
+
+_ATTACHMENT_NAME = "prompt.txt"
+
+_ATTACH_FILE_SCRIPT = """
+const [input, inline, name] = arguments;
+const text = inline ?? window.__intenseText.join("");
+delete window.__intenseText;
+window.__intenseAttachments = document.evaluate(`count(//text()[contains(., "${name}")])`, document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+
+const transfer = new DataTransfer();
+transfer.items.add(new File([text], name, { type: "text/plain" }));
+input.files = transfer.files;
+input.dispatchEvent(new Event("input", { bubbles: true }));
+input.dispatchEvent(new Event("change", { bubbles: true }));
+return input.files.length === 1 ? input.files[0].size : null;
+"""
+
+_ATTACHMENT_TAKEN_SCRIPT = """
+const [name, buttonXpath] = arguments;
+const shown = document.evaluate(`count(//text()[contains(., "${name}")])`, document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+const button = document.evaluate(buttonXpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+return shown > (window.__intenseAttachments ?? 0) || (button !== null && button.getAttribute("aria-disabled") === "false");
+"""
+
+def utf16_length(text: str) -> int:
+    # String length as the page counts it, in UTF-16 code units.
+    return len(text.encode("utf-16-le", "surrogatepass")) // 2
+
+def page_utf8(text: str) -> bytes:
+    # What TextEncoder and File produce for this string in the page: adjacent surrogates pair up
+    # and lone ones become U+FFFD.
+    return text.encode("utf-16-le", "surrogatepass").decode("utf-16-le", "replace").encode("utf-8")
+
+def _page_text(driver: Driver, text: str) -> Optional[str]:
+    # Huge prompts are assembled in the page so no single WebDriver command carries the whole payload.
+    # Returns the text to pass inline, or None once it has been staged.
+    if len(text) <= _INPUT_CHUNK_SIZE:
+        return text
+    
+    for index in range(0, len(text), _INPUT_CHUNK_SIZE):
+        driver.execute_script(_STAGE_CHUNK_SCRIPT, text[index:index + _INPUT_CHUNK_SIZE], index == 0)
+    return None
+
+def _attach_in_page(driver: Driver, file_input, text: str) -> bool:
+    try:
+        size = driver.execute_script(_ATTACH_FILE_SCRIPT, file_input, _page_text(driver, text), _ATTACHMENT_NAME)
+        if size != len(page_utf8(text)):
+            return False
+        
+        # A built File only proves the page holds it; DeepSeek has taken it once the name shows up or sending is allowed.
+        return bool(wait_for("attachment_taken", lambda: driver.execute_script(_ATTACHMENT_TAKEN_SCRIPT, _ATTACHMENT_NAME, _SEND_BUTTON_XPATH), timeout=3))
+    except Exception as e:
+        print(f"Error when attaching text file in page: {e}")
+        return False
+
 def _send_chat_file(driver: Driver, text: str) -> bool:
     try:
         global manager
-        temp_file = manager.create_temp_txt(text)
         file_input = driver.wait_for_element_present("input[type='file']", by="css selector", timeout=10)
-        file_input.send_keys(temp_file)
+        
+        # The file is built in the page; a temp file on disk is only the fallback.
+        if not _attach_in_page(driver, file_input, text):
+            temp_file = manager.create_temp_txt(text)
+            file_input.send_keys(temp_file)
         
         return _click_send_message_button(driver)
     except Exception as e:
         print(f"Error when attaching text file: {e}")
         return False
 
-def _send_chat_text(driver: Driver, text: str) -> bool:
-    try:
-        def attempt_send():
-            chat_input = driver.wait_for_element_present("chat-input", by="id", timeout=15)
-            
-            for _ in range(3):
-                chat_input.clear()
-                driver.execute_script("arguments[0].value = arguments[1];", chat_input, text)
-                chat_input.send_keys(" ")
-                chat_input.send_keys(Keys.BACKSPACE)
-                
-                if chat_input.get_attribute("value") == text:
-                    return True
-                
-                time.sleep(1)
-            
-            return False
+_INPUT_DIGEST_SCRIPT = """
+const [input, done] = [arguments[0], arguments[arguments.length - 1]];
+const value = input.value;
+if (!window.crypto || !crypto.subtle) {
+    done(null);
+    return;
+}
+crypto.subtle.digest("SHA-256", new TextEncoder().encode(value))
+    .then((buffer) => done([value.length, Array.from(new Uint8Array(buffer), (byte) => byte.toString(16).padStart(2, "0")).join("")]))
+    .catch(() => done(null));
+"""
+
+def _set_input_value(driver: Driver, chat_input, text: str) -> None:
+    if len(text) <= _INPUT_CHUNK_SIZE:
+        driver.execute_script("arguments[0].value = arguments[1];", chat_input, text)
+    else:
+        driver.execute_script(_SET_INPUT_SCRIPT, chat_input, _page_text(driver, text))
+
+def _input_matches(driver: Driver, chat_input, text: str) -> bool:
+    # The page hashes what it holds, so the prompt never has to travel back over the wire to be checked.
+    expected = text.replace("\r\n", "\n").replace("\r", "\n")
+    digest = driver.execute_async_script(_INPUT_DIGEST_SCRIPT, chat_input)
+    if not digest:
+        return chat_input.get_attribute("value") == expected
+    
+    length, value_hash = digest
+    return length == utf16_length(expected) and value_hash == hashlib.sha256(page_utf8(expected)).hexdigest()
+
+def _paste_chat_text(driver: Driver, text: str, rounds: int = 2) -> bool:
+    def attempt_paste():
+        chat_input = driver.wait_for_element_present("chat-input", by="id", timeout=15)
         
-        for _ in range(2):
-            if attempt_send():
-                return _click_send_message_button(driver)
+        for _ in range(3):
+            chat_input.clear()
+            _set_input_value(driver, chat_input, text)
+            chat_input.send_keys(" ")
+            chat_input.send_keys(Keys.BACKSPACE)
             
-            driver.refresh()
-            time.sleep(1)
+            if wait_for("input_value", lambda: _input_matches(driver, chat_input, text), timeout=1):
+                return True
         
         return False
+    
+    # A failed round ends with a reload, so the input is always left empty.
+    for _ in range(rounds):
+        if attempt_paste():
+            return True
+        
+        driver.refresh()
+        wait_for("reload_page", lambda: _chat_input_present(driver), timeout=15)
+    
+    return False
+
+def _send_chat_text(driver: Driver, text: str) -> bool:
+    try:
+        return _paste_chat_text(driver, text) and _click_send_message_button(driver)
     except Exception as e:
         print(f"Error when pasting prompt: {e}")
         return False
 
-def send_chat_message(driver: Driver, text: str, text_file: bool) -> bool:
-    if text_file:
+# =============================================================================================================================
+# Adaptive paste or upload
+# =============================================================================================================================
+
+_UPLOAD_THRESHOLD = 65536
+_PASTE_FAILURE_PENALTY = 10.0
+_EXPLORE_EVERY = 8
+
+class SendCosts:
+    """Running paste and upload times for one browser, kept per power-of-two prompt size."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.choices = 0
+
+    def estimate(self, method: str, size: int) -> Optional[float]:
+        return self.seconds.get((method, size.bit_length()))
+
+    def record(self, method: str, size: int, seconds: float) -> None:
+        key = (method, size.bit_length())
+        previous = self.seconds.get(key)
+        self.seconds[key] = seconds if previous is None else previous * 0.7 + seconds * 0.3
+
+    def choose(self, size: int) -> str:
+        self.choices += 1
+        paste, upload = self.estimate("paste", size), self.estimate("upload", size)
+        if paste is None and upload is None:
+            return "paste" if size < _UPLOAD_THRESHOLD else "upload"
+        
+        if paste is None or upload is None:
+            # Now and then the unmeasured path is tried so the choice is not settled by one sample.
+            measured = "upload" if paste is None else "paste"
+            unmeasured = "paste" if paste is None else "upload"
+            return unmeasured if self.choices % _EXPLORE_EVERY == 0 else measured
+        
+        return "paste" if paste <= upload else "upload"
+
+def _send_adaptive(driver: Driver, text: str) -> bool:
+    costs = getattr(driver, "_intense_send_costs", None)
+    if costs is None:
+        costs = driver._intense_send_costs = SendCosts()
+    
+    size = len(text)
+    if costs.choose(size) == "paste":
+        started = time.perf_counter()
+        try:
+            pasted = _paste_chat_text(driver, text, rounds=1)
+        except Exception as e:
+            print(f"Error when pasting prompt: {e}")
+            pasted = False
+        
+        if pasted:
+            sent = _click_send_message_button(driver)
+            if sent:
+                costs.record("paste", size, time.perf_counter() - started)
+            return sent
+        
+        costs.record("paste", size, time.perf_counter() - started + _PASTE_FAILURE_PENALTY)
+    
+    started = time.perf_counter()
+    sent = _send_chat_file(driver, text)
+    if sent:
+        costs.record("upload", size, time.perf_counter() - started)
+    return sent
+
+def send_chat_message(driver: Driver, text: str, text_file: bool, adaptive: bool = False) -> bool:
+    if adaptive:
+        return _send_adaptive(driver, text)
+    elif text_file:
         return _send_chat_file(driver, text)
     else:
         return _send_chat_text(driver, text)
@@ -150,31 +367,24 @@ def send_chat_message(driver: Driver, text: str, text_file: bool) -> bool:
 # HTML extraction and processing
 # =============================================================================================================================
 
-def _remove_em_inside_strong(html: str) -> str:
-    try:
-        result = []
-        inside_strong = False
-        i = 0
-        while i < len(html):
-            if html[i:i+8] == "<strong>":
-                inside_strong = True
-                result.append("<strong>")
-                i += 8
-            elif html[i:i+9] == "</strong>":
-                inside_strong = False
-                result.append("</strong>")
-                i += 9
-            elif html[i:i+4] == "<em>" and inside_strong:
-                i += 4
-            elif html[i:i+5] == "</em>" and inside_strong:
-                i += 5
-            else:
-                result.append(html[i])
-                i += 1
-        return "".join(result)
-    except Exception as e:
-        print(f"Error when editing html: {e}")
-        return html
+_SPAN_MARKERS = "*_`~"
+_SPAN_OPENER = re.compile(r"(?<!\S)[*_`~]+(?=\S)")
+
+def stable_prefix(text: str) -> str:
+    # While a span is still being written the converter closes it at the tail ("*Tom*" becomes
+    # "*Tom &*"), so a trailing closer and the span it closes are held back, as is trailing space.
+    text = text.rstrip()
+    trailing = len(text)
+    while trailing and text[trailing - 1] in _SPAN_MARKERS:
+        trailing -= 1
+    if trailing == len(text):
+        return text
+    
+    # Like get_closing_symbol, only the last line is searched, so each tick costs the same however long the reply is.
+    opener = None
+    for opener in _SPAN_OPENER.finditer(text, text.rfind("\n", 0, trailing) + 1, trailing):
+        pass
+    return text[:opener.start() if opener else trailing]
 
 def get_closing_symbol(text: str) -> str:
     try:
@@ -206,51 +416,111 @@ def get_closing_symbol(text: str) -> str:
     except Exception:
         return ""
 
-def get_last_message(driver: Driver) -> Optional[str]:
-    try:
-        messages = driver.find_elements("xpath", "//div[contains(@class, 'ds-markdown ds-markdown--block')]")
-        
-        if messages:
-            last_message_html = messages[-1].get_attribute("innerHTML")
-            
-            last_message_html = _remove_em_inside_strong(last_message_html)
+class MessageConverter:
+    MODE = "blocks"
 
-            processed_message = re.sub(r'</p></li>', '', last_message_html)
+    # Every cleanup rule stays within a line or a run of newlines, so text up to a blank line
+    # that is followed by more text can be cleaned once and never looked at again.
+    _SAFE_SPLIT = re.compile(r'\n\n(?=[^\n])')
+    # A block can only be converted on its own when the next one starts with a tag that survives
+    # the substitutions, otherwise their text would merge into a single node when parsed together.
+    _BLOCK_START = re.compile(r'<(?!li>|br\s*/?>|/?code>|/?strong>|/?em>)', re.IGNORECASE)
 
-            processed_message = re.sub(r'</h3>(?!$)', '\n\n', processed_message)
-            processed_message = re.sub(r'</p>(?!$)', '\n\n', processed_message)
-            processed_message = re.sub(r'</ul>(?!$)', '\n\n', processed_message)
-            processed_message = re.sub(r'<li>', '\n- ', processed_message)
-            processed_message = re.sub(r'<br\s*/?>', '\n', processed_message, flags=re.IGNORECASE)
+    def __init__(self):
+        self.reset()
 
-            processed_message = re.sub(r'</?code>', '`', processed_message)
-            processed_message = re.sub(r'</?strong>', '*', processed_message)
-            processed_message = re.sub(r'</?em>', '*', processed_message)
+    def reset(self) -> None:
+        self.count = 0
+        self.stable = 0
+        self.prefix_length = 0
+        self.html = None
+        self._stable_html = ""
+        self._clean_head = ""
+        self._pending = ""
 
-            processed_message = re.sub(r'&amp;', '&', processed_message)
-            processed_message = re.sub(r'&lt;', '<', processed_message)
-            processed_message = re.sub(r'&gt;', '>', processed_message)
-            processed_message = re.sub(r'&nbsp;', ' ', processed_message)
-            processed_message = re.sub(r'&quot;', '"', processed_message)
-            
-            soup = BeautifulSoup(processed_message, 'html.parser')
-            text_only = soup.get_text()
-            
-            clean_text = re.sub(r'\n{3,}', '\n\n', text_only)
-            clean_text = re.sub(r'\*{2,}', '*', clean_text)
-            clean_text = re.sub(r'"{2,}', '"', clean_text)
-            clean_text = re.sub(r'`{2,}', '`', clean_text)
-            
-            clean_text = re.sub(r'^\*([^\s*]+)\s\*(.*)$', r'*\1 \2', clean_text, flags=re.MULTILINE)
+    def arguments(self) -> tuple:
+        return (self.stable, self.prefix_length)
 
-            return clean_text.strip("\n")
+    def _add_stable_blocks(self, html: str, nodes: int) -> None:
+        self._pending += html_converter.html_to_raw_text(html, final=False)
+        self._stable_html += html
+        self.stable += nodes
+        # The page measures the prefix in UTF-16 code units.
+        self.prefix_length += len(html.encode("utf-16-le")) // 2
 
-        else:
+        split = None
+        for split in self._SAFE_SPLIT.finditer(self._pending):
+            pass
+
+        if split:
+            self._clean_head += html_converter.clean_text(self._pending[:split.end()])
+            self._pending = self._pending[split.end():]
+
+    def update(self, state: dict) -> Optional[str]:
+        count = state.get("count", 0)
+        if not count:
+            self.reset()
             return None
-    
-    except Exception as e:
-        print(f"Error when extracting the last response: {e}")
-        return None
+
+        if count != self.count or state.get("offset", 0) != self.stable:
+            self.reset()
+            self.count = count
+            if state.get("offset", 0):
+                return None
+
+        blocks = state.get("blocks") or []
+        self.html = self._stable_html + "".join(blocks)
+        group, nodes = "", 0
+        for index, html in enumerate(blocks[:-1]):
+            group += html
+            nodes += 1
+            if self._BLOCK_START.match(blocks[index + 1]):
+                self._add_stable_blocks(group, nodes)
+                group, nodes = "", 0
+
+        tail = html_converter.html_to_raw_text(group + blocks[-1]) if blocks else ""
+        return (self._clean_head + html_converter.clean_text(self._pending + tail)).strip("\n")
+
+class PageTextReader:
+    # The page converts the message itself and only sends what was appended since the last read.
+    MODE = "text"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.text = ""
+        self.units = 0
+
+    def arguments(self) -> tuple:
+        return (self.units, 0)
+
+    def update(self, state: dict) -> Optional[str]:
+        count = state.get("count", 0)
+        if count != self.count:
+            self.reset()
+            self.count = count
+
+        if not count:
+            return None
+
+        text = state.get("text") or ""
+        # The page measures lengths in UTF-16 code units.
+        units = len(text.encode("utf-16-le")) // 2
+        if state.get("append"):
+            self.text += text
+            self.units += units
+        else:
+            self.text = text
+            self.units = units
+        return self.text
+
+def message_count(driver: Driver) -> int:
+    try:
+        return len(driver.find_elements("xpath", "//div[contains(@class, 'ds-markdown ds-markdown--block')]"))
+    except Exception:
+        return 0
 
 # =============================================================================================================================
 # Bot response generation
@@ -264,9 +534,284 @@ def active_generate_response(driver: Driver) -> bool:
         print(f"Error generating response: {e}")
         return False
 
-def is_response_generating(driver: Driver) -> bool:
+_REGENERATE_SCRIPT = """
+const messages = document.querySelectorAll("div.ds-markdown.ds-markdown--block");
+if (!messages.length) return false;
+
+// The action bar under a reply holds copy first and regenerate second.
+const message = messages[messages.length - 1];
+let container = message.parentElement;
+for (let depth = 0; container && depth < 4; depth++, container = container.parentElement) {
+    const buttons = Array.from(container.querySelectorAll("div.ds-icon-button"))
+        .filter((button) => message.compareDocumentPosition(button) & Node.DOCUMENT_POSITION_FOLLOWING);
+    if (buttons.length >= 2) {
+        buttons[1].click();
+        return true;
+    }
+}
+return false;
+"""
+
+def regenerate_response(driver: Driver, timeout: float = 5) -> bool:
+    try:
+        if not driver.execute_script(_REGENERATE_SCRIPT):
+            return False
+
+        driver.wait_for_element_present("//div[@role='button' and contains(@class, '_7436101')]//div[contains(@class, '_480132b')]", by="xpath", timeout=timeout)
+        return True
+    except Exception as e:
+        print(f"Error regenerating response: {e}")
+        return False
+
+def stop_generation(driver: Driver) -> bool:
+    # While a reply is generating the send button shows the stop icon and acts as the stop control.
     try:
+        stop_xpath = "//div[@role='button' and contains(@class, '_7436101')]//div[contains(@class, '_480132b')]"
+        if not driver.find_elements("xpath", stop_xpath):
+            return False
+        
         button = driver.find_element("xpath", "//div[@role='button' and contains(@class, '_7436101')]")
-        return button.get_attribute("aria-disabled") == "false"
+        driver.execute_script("arguments[0].click();", button)
+        return bool(wait_for("stop_generation", lambda: not driver.find_elements("xpath", stop_xpath), timeout=5))
+    except Exception as e:
+        print(f"Error stopping generation: {e}")
+        return False
+
+# =============================================================================================================================
+# Response streaming
+# =============================================================================================================================
+
+_READ_STATE_SCRIPT = """
+const extractText = (root) => {
+    // Same rules as the Python converter, which reads the serialized markup: opening tags only turn
+    // into symbols without attributes, <em> is dropped between <strong> and the next </strong>, and
+    // a </p>, </h3> or </ul> that ends the markup stays a tag instead of a paragraph break.
+    // Text that decodes to markup, such as "&lt;b&gt;", is the one difference: it is kept as text.
+    const symbols = new Map([["strong", "*"], ["em", "*"], ["code", "`"]]);
+    const parts = [];
+    let segment = [];
+    let strong = false;
+    const boundary = (pre) => {
+        let text = segment.join("");
+        if (text && !pre && !/[^ \\n\\t\\f\\r]/.test(text)) text = text.includes("\\n") ? "\\n" : " ";
+        parts.push(text);
+        segment = [];
+    };
+
+    const nodes = root.childNodes;
+    let end = nodes.length - 1;
+    if (end > 0 && nodes[end].nodeType === 3 && nodes[end].data === "\\n") end--;
+    const last = end >= 0 && nodes[end].nodeType === 1 && ["P", "H3", "UL"].includes(nodes[end].tagName) ? nodes[end] : null;
+
+    const walk = (node, pre) => {
+        if (node.nodeType === 3) return segment.push(node.data.replace(/\\u00a0/g, " "));
+        if (node.nodeType === 8) return boundary(pre);
+        if (node.nodeType !== 1) return;
+
+        const tag = node.tagName.toLowerCase();
+        if (tag === "script" || tag === "style") return;
+        const plain = node.attributes.length === 0;
+        if (tag === "br") return plain ? segment.push("\\n") : boundary(pre);
+
+        const dropped = plain && tag === "em" && strong;
+        if (plain && symbols.has(tag)) segment.push(dropped ? "" : symbols.get(tag));
+        else if (plain && tag === "li") segment.push("\\n- ");
+        else if (!dropped) boundary(pre);
+        if (plain && tag === "strong") strong = true;
+
+        const inner = pre || tag === "pre";
+        for (const child of node.childNodes) walk(child, inner);
+
+        const lastChild = node.lastChild;
+        const endsWithParagraph = !!lastChild && lastChild.nodeType === 1 && lastChild.tagName === "P";
+        const lastInItem = !!node.parentElement && node.parentElement.tagName === "LI" && node.parentElement.lastChild === node;
+        if (tag === "strong") strong = false;
+        if (symbols.has(tag)) {
+            if (!(tag === "em" && strong)) segment.push(symbols.get(tag));
+        } else if (node === last) {
+            boundary(inner);
+        } else if (tag === "p" || tag === "h3" || tag === "ul") {
+            if (!(tag === "p" && lastInItem)) segment.push("\\n\\n");
+        } else if (tag !== "li" || !endsWithParagraph) {
+            boundary(inner);
+        }
+    };
+
+    for (const child of nodes) walk(child, false);
+    boundary(false);
+    return parts.join("")
+        .replace(/\\n{3,}/g, "\\n\\n")
+        .replace(/\\*{2,}/g, "*")
+        .replace(/"{2,}/g, '"')
+        .replace(/`{2,}/g, "`")
+        .replace(/^\\*([^\\s*]+)\\s\\*(.*)$/gm, "*$1 $2")
+        .replace(/^\\n+|\\n+$/g, "");
+};
+
+const serialize = (node) => {
+    if (node.nodeType === 1) return node.outerHTML;
+    if (node.nodeType === 3) return node.data.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/\\u00a0/g, "&nbsp;");
+    if (node.nodeType === 8) return "<!--" + node.data + "-->";
+    return "";
+};
+
+const readState = (buttonXpath, mode, first, second) => {
+    const button = document.evaluate(buttonXpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const messages = document.querySelectorAll("div.ds-markdown.ds-markdown--block");
+    const state = {
+        generating: !!button && button.getAttribute("aria-disabled") === "false",
+        count: messages.length
+    };
+    if (!messages.length) return state;
+    const message = messages[messages.length - 1];
+
+    if (mode === "text") {
+        // Only the new suffix is sent when the text still starts with what Python already has.
+        const text = extractText(message);
+        const previous = window.__intenseText;
+        state.append = first > 0 && typeof previous === "string" && previous.length === first && text.startsWith(previous);
+        state.text = state.append ? text.slice(first) : text;
+        window.__intenseText = text;
+        return state;
+    }
+
+    const nodes = Array.from(message.childNodes);
+    let offset = Math.min(first, nodes.length);
+    let length = 0;
+    for (let i = 0; i < offset; i++) length += serialize(nodes[i]).length;
+    if (length !== second) offset = 0;
+
+    state.offset = offset;
+    state.blocks = nodes.slice(offset).map(serialize);
+    return state;
+};
+"""
+
+_OBSERVER_SCRIPT = """
+const buttonXpath = arguments[0];
+const stream = window.__intenseStream = {changed: true, generating: true, waiter: null};
+if (window.__intenseObserver) window.__intenseObserver.disconnect();
+
+const isGenerating = () => {
+    const button = document.evaluate(buttonXpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return !!button && button.getAttribute("aria-disabled") === "false";
+};
+
+window.__intenseObserver = new MutationObserver((mutations) => {
+    const generating = isGenerating();
+    const changed = mutations.some((mutation) => {
+        const element = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+        return !!element && !!element.closest(".ds-markdown");
+    });
+
+    if (changed || generating !== stream.generating) {
+        stream.changed = true;
+        stream.generating = generating;
+        if (stream.waiter) {
+            const waiter = stream.waiter;
+            stream.waiter = null;
+            waiter();
+        }
+    }
+});
+window.__intenseObserver.observe(document.body, {childList: true, subtree: true, characterData: true, attributes: true, attributeFilter: ["aria-disabled"]});
+stream.generating = isGenerating();
+return true;
+"""
+
+_OBSERVER_WAIT_SCRIPT = _READ_STATE_SCRIPT + """
+const done = arguments[arguments.length - 1];
+const stream = window.__intenseStream;
+if (!stream) return done(null);
+
+const flush = () => {
+    stream.changed = false;
+    done(readState(arguments[1], arguments[2], arguments[3], arguments[4]));
+};
+
+if (stream.changed || !stream.generating) return flush();
+stream.waiter = flush;
+setTimeout(() => {
+    if (stream.waiter === flush) {
+        stream.waiter = null;
+        flush();
+    }
+}, arguments[0]);
+"""
+
+_OBSERVER_STOP_SCRIPT = """
+if (window.__intenseObserver) window.__intenseObserver.disconnect();
+window.__intenseObserver = null;
+window.__intenseStream = null;
+"""
+
+_POLL_SCRIPT = _READ_STATE_SCRIPT + """
+return readState(arguments[0], arguments[1], arguments[2], arguments[3]);
+"""
+
+_SEND_BUTTON_XPATH = "//div[@role='button' and contains(@class, '_7436101')]"
+
+def _start_response_observer(driver: Driver) -> bool:
+    try:
+        return bool(driver.execute_script(_OBSERVER_SCRIPT, _SEND_BUTTON_XPATH))
+    except Exception as e:
+        print(f"Error starting response observer: {e}")
+        return False
+
+def _stop_response_observer(driver: Driver) -> None:
+    try:
+        driver.execute_script(_OBSERVER_STOP_SCRIPT)
     except Exception:
-        return False
\ No newline at end of file
+        pass
+
+def _read_update(reader, state: dict, skip: int, recorder) -> Optional[str]:
+    # Messages that were already on the page before sending belong to earlier turns.
+    if state.get("count", 0) <= skip:
+        return None
+
+    text = reader.update(state)
+    if recorder:
+        recorder.record(reader.html)
+    return text
+
+def _observe_last_message(driver: Driver, reader, timeout: float, recorder=None, skip: int = 0) -> Generator[Optional[str], None, None]:
+    try:
+        while True:
+            state = driver.execute_async_script(_OBSERVER_WAIT_SCRIPT, int(timeout * 1000), _SEND_BUTTON_XPATH, reader.MODE, *reader.arguments())
+            if not state:
+                break
+
+            # The last text mutation usually arrives in the same batch as the button flip.
+            yield _read_update(reader, state, skip, recorder)
+            if not state.get("generating"):
+                break
+    finally:
+        _stop_response_observer(driver)
+
+def poll_response(driver: Driver, reader=None) -> Optional[dict]:
+    try:
+        reader = reader or MessageConverter()
+        return driver.execute_script(_POLL_SCRIPT, _SEND_BUTTON_XPATH, reader.MODE, *reader.arguments())
+    except Exception as e:
+        print(f"Error polling response: {e}")
+        return None
+
+def _poll_last_message(driver: Driver, reader, interval: float, recorder=None, skip: int = 0) -> Generator[Optional[str], None, None]:
+    while True:
+        state = poll_response(driver, reader)
+        if not state:
+            break
+
+        # The state that shows generation has ended still carries the final message.
+        yield _read_update(reader, state, skip, recorder)
+        if not state.get("generating"):
+            break
+        time.sleep(interval)
+
+def stream_last_message(driver: Driver, event_driven: bool = False, page_extraction: bool = False, interval: float = 0.1, timeout: float = 1.0, recorder=None, skip: int = 0) -> Generator[Optional[str], None, None]:
+    # Recording needs the message markup, which only the block reader receives.
+    reader = PageTextReader() if page_extraction and not recorder else MessageConverter()
+    if event_driven and _start_response_observer(driver):
+        yield from _observe_last_message(driver, reader, timeout, recorder, skip)
+    else:
+        yield from _poll_last_message(driver, reader, interval, recorder, skip)
@@ -0,0 +1,95 @@
+from typing import List, Optional, Tuple
+import glob, gzip, json, os, threading, time
+
+manager = None
+
+RECORDINGS_DIR = "recordings"
+
+# =============================================================================================================================
+# Generation Recorder
+# =============================================================================================================================
+
+class GenerationRecorder:
+    def __init__(self, request_id: int, metadata: Optional[dict] = None):
+        self.path = None
+        self.frames = 0
+        self._file = None
+        self._last_html = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+        try:
+            directory = manager.get_path("executable", RECORDINGS_DIR) if manager else None
+            if not directory:
+                raise ValueError("Invalid recordings path.")
+
+            os.makedirs(directory, exist_ok=True)
+            name = f"generation-{time.strftime('%Y%m%d-%H%M%S')}-{request_id}.jsonl.gz"
+            self.path = os.path.join(directory, name)
+            self._file = gzip.open(self.path, "wt", encoding="utf-8")
+            self._write({"started": time.time(), **(metadata or {})})
+        except Exception as e:
+            print(f"Error starting generation recording: {e}")
+            self._file = None
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def record(self, html: Optional[str]) -> None:
+        with self._lock:
+            if not self._file or html is None or html == self._last_html:
+                return
+
+            try:
+                self._write({"t": round(time.monotonic() - self._started, 4), "html": html})
+                self._last_html = html
+                self.frames += 1
+            except Exception as e:
+                print(f"Error recording generation: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file:
+                return
+
+            try:
+                self._file.close()
+                if self.frames:
+                    print(f"Recorded {self.frames} snapshots to {self.path}")
+                else:
+                    os.remove(self.path)
+            except Exception as e:
+                print(f"Error closing generation recording: {e}")
+            self._file = None
+
+# =============================================================================================================================
+# Replay Fixtures
+# =============================================================================================================================
+
+def load_recording(path: str) -> Tuple[dict, List[Tuple[float, str]]]:
+    metadata, frames = {}, []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            entry = json.loads(line)
+            if number == 0 and "html" not in entry:
+                metadata = entry
+            elif "html" in entry:
+                frames.append((float(entry.get("t", 0)), entry["html"]))
+    return metadata, frames
+
+def load_fixtures(directory: Optional[str] = None) -> List[List[Tuple[float, str]]]:
+    # Frame lists in the shape ReplayDriver expects, one per recorded generation.
+    if not directory:
+        directory = manager.get_path("executable", RECORDINGS_DIR) if manager else None
+    if not directory:
+        return []
+
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        try:
+            _, frames = load_recording(path)
+            if frames:
+                fixtures.append(frames)
+        except Exception as e:
+            print(f"Error loading recording {path}: {e}")
+    return fixtures
@@ -0,0 +1,221 @@
+from bs4 import BeautifulSoup
+import re
+
+# =============================================================================================================================
+# Patterns
+# =============================================================================================================================
+
+_TOKEN = re.compile(r'(<!--.*?-->)|<(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|([^<]+)|(<)', re.DOTALL)
+_FINAL_CLOSER = re.compile(r'(</h3>|</p>|</ul>)(\n?)\Z')
+_AMBIGUOUS_END = re.compile(r'(?:</h3>|</p>|</ul>)(?:</?em>|</p></li>|\n)*(?:</?em>|</p></li>)\n?\Z')
+_BREAK_ATTRIBUTES = re.compile(r'\s*/?')
+_UNSAFE_TEXT = re.compile(r'<(?:[A-Za-z/!?]|$)|&(?:[#A-Za-z]|$)')
+_UNSUPPORTED_TAGS = {"script", "style", "template", "textarea"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"
+}
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+_NEWLINES = re.compile(r'\n{3,}')
+_ASTERISKS = re.compile(r'\*{2,}')
+_QUOTES = re.compile(r'"{2,}')
+_BACKTICKS = re.compile(r'`{2,}')
+_SPLIT_ACTION = re.compile(r'^\*([^\s*]+)\s\*(.*)$', re.MULTILINE)
+
+# Tags the legacy chain rewrites into text before parsing, so they never split a string.
+_INLINE_TAGS = {
+    "li": "\n- ", "code": "`", "/code": "`", "strong": "*", "/strong": "*", "em": "*", "/em": "*",
+    "/h3": "\n\n", "/p": "\n\n", "/ul": "\n\n"
+}
+
+# =============================================================================================================================
+# Legacy conversion chain
+# =============================================================================================================================
+
+def _remove_em_inside_strong(html: str) -> str:
+    try:
+        result = []
+        inside_strong = False
+        i = 0
+        while i < len(html):
+            if html[i:i+8] == "<strong>":
+                inside_strong = True
+                result.append("<strong>")
+                i += 8
+            elif html[i:i+9] == "</strong>":
+                inside_strong = False
+                result.append("</strong>")
+                i += 9
+            elif html[i:i+4] == "<em>" and inside_strong:
+                i += 4
+            elif html[i:i+5] == "</em>" and inside_strong:
+                i += 5
+            else:
+                result.append(html[i])
+                i += 1
+        return "".join(result)
+    except Exception as e:
+        print(f"Error when editing html: {e}")
+        return html
+
+def _legacy_raw_text(html: str, final: bool = True) -> str:
+    # Only the final block of a message may end with a closing tag that is dropped instead of becoming a break.
+    end = r'(?!$)' if final else ''
+    html = _remove_em_inside_strong(html)
+
+    processed_message = re.sub(r'</p></li>', '', html)
+
+    processed_message = re.sub(r'</h3>' + end, '\n\n', processed_message)
+    processed_message = re.sub(r'</p>' + end, '\n\n', processed_message)
+    processed_message = re.sub(r'</ul>' + end, '\n\n', processed_message)
+    processed_message = re.sub(r'<li>', '\n- ', processed_message)
+    processed_message = re.sub(r'<br\s*/?>', '\n', processed_message, flags=re.IGNORECASE)
+
+    processed_message = re.sub(r'</?code>', '`', processed_message)
+    processed_message = re.sub(r'</?strong>', '*', processed_message)
+    processed_message = re.sub(r'</?em>', '*', processed_message)
+
+    processed_message = re.sub(r'&amp;', '&', processed_message)
+    processed_message = re.sub(r'&lt;', '<', processed_message)
+    processed_message = re.sub(r'&gt;', '>', processed_message)
+    processed_message = re.sub(r'&nbsp;', ' ', processed_message)
+    processed_message = re.sub(r'&quot;', '"', processed_message)
+
+    soup = BeautifulSoup(processed_message, 'html.parser')
+    return soup.get_text()
+
+# =============================================================================================================================
+# Single-pass conversion
+# =============================================================================================================================
+
+class _UnsupportedMarkup(Exception):
+    pass
+
+def _flush(parts: list, buffer: list, preserve: int) -> None:
+    if not buffer:
+        return
+
+    text = "".join(buffer)
+    buffer.clear()
+    if _UNSAFE_TEXT.search(text):
+        raise _UnsupportedMarkup()
+
+    # BeautifulSoup collapses whitespace-only strings outside <pre>.
+    if not preserve and not text.strip(_ASCII_SPACES):
+        text = "\n" if "\n" in text else " "
+    parts.append(text)
+
+def _single_pass_raw_text(html: str, final: bool) -> str:
+    # Mirrors the '(?!$)' lookahead: a closing tag at the very end is kept as a tag, not turned into a break.
+    last_tag, trailing = None, ""
+    if final:
+        # Tags the legacy chain deletes could also leave a closing tag at the end; leave those to it.
+        if _AMBIGUOUS_END.search(html):
+            raise _UnsupportedMarkup()
+        match = _FINAL_CLOSER.search(html)
+        if match:
+            last_tag, trailing = match.group(1), match.group(2)
+            html = html[:match.start()]
+
+    parts, buffer, open_tags = [], [], []
+    preserve = 0
+    inside_strong = False
+    pending_paragraph = False
+
+    tokens = _TOKEN.findall(html)
+    final_index = len(tokens)
+    if last_tag:
+        tokens.append(("", "/", last_tag[2:-1], "", "", ""))
+        if trailing:
+            tokens.append(("", "", "", "", trailing, ""))
+
+    for index, (comment, slash, name, attributes, text, stray) in enumerate(tokens):
+        if stray:
+            raise _UnsupportedMarkup()
+
+        if name:
+            key = slash + name
+            # <em> inside <strong> is deleted outright by the legacy chain.
+            if inside_strong and name == "em" and not attributes:
+                continue
+            # So is every "</p></li>" pair.
+            if pending_paragraph:
+                pending_paragraph = False
+                if key == "/li" and not attributes:
+                    continue
+                buffer.append("\n\n")
+
+            if not attributes and key in _INLINE_TAGS and index != final_index:
+                if key == "strong":
+                    inside_strong = True
+                elif key == "/strong":
+                    inside_strong = False
+                elif key == "/p":
+                    pending_paragraph = True
+                    continue
+                buffer.append(_INLINE_TAGS[key])
+                continue
+
+            if name.lower() == "br" and not slash and _BREAK_ATTRIBUTES.fullmatch(attributes):
+                buffer.append("\n")
+                continue
+
+            if "&" in attributes:
+                raise _UnsupportedMarkup()
+
+            name = name.lower()
+            if name in _UNSUPPORTED_TAGS:
+                raise _UnsupportedMarkup()
+
+            _flush(parts, buffer, preserve)
+            if name in _VOID_TAGS:
+                continue
+
+            # Same tree as BeautifulSoup: an end tag closes everything up to its most recent match.
+            if not slash:
+                open_tags.append(name)
+                preserve += name == "pre"
+            elif name in open_tags:
+                while open_tags:
+                    popped = open_tags.pop()
+                    preserve -= popped == "pre"
+                    if popped == name:
+                        break
+            continue
+
+        if pending_paragraph:
+            pending_paragraph = False
+            buffer.append("\n\n")
+
+        if text:
+            if "&" in text:
+                text = text.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">").replace("&nbsp;", " ").replace("&quot;", '"')
+            buffer.append(text)
+        else:
+            _flush(parts, buffer, preserve)
+
+    if pending_paragraph:
+        buffer.append("\n\n")
+    _flush(parts, buffer, preserve)
+    return "".join(parts)
+
+# =============================================================================================================================
+# Public API
+# =============================================================================================================================
+
+def html_to_raw_text(html: str, final: bool = True) -> str:
+    try:
+        return _single_pass_raw_text(html, final)
+    except _UnsupportedMarkup:
+        return _legacy_raw_text(html, final)
+
+def clean_text(text: str) -> str:
+    clean = _NEWLINES.sub('\n\n', text)
+    clean = _ASTERISKS.sub('*', clean)
+    clean = _QUOTES.sub('"', clean)
+    clean = _BACKTICKS.sub('`', clean)
+    return _SPLIT_ACTION.sub(r'*\1 \2', clean)
+
+def html_to_text(html: str) -> str:
+    return clean_text(html_to_raw_text(html)).strip("\n")
@@ -0,0 +1,113 @@
+from typing import Dict, List, Tuple
+import bisect, threading
+
+# =============================================================================================================================
+# Metric Types
+# =============================================================================================================================
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(total)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+# =============================================================================================================================
+# Application Metrics
+# =============================================================================================================================
+
+_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+REQUESTS = Counter("intense_requests_total", "Chat completion requests by outcome.", ("outcome",))
+STAGE_SECONDS = Histogram("intense_stage_seconds", "Time spent in each stage of a request.", _SECONDS, ("stage",))
+CHARS_PER_SECOND = Histogram("intense_generation_chars_per_second", "Characters received per second of generation.", (10, 25, 50, 100, 200, 400, 800, 1600))
+WEBDRIVER_CALLS = Histogram("intense_webdriver_calls", "WebDriver commands issued per request.", (5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+WAIT_SECONDS = Histogram("intense_wait_seconds", "Time spent waiting for a page condition.", (0.01, 0.025) + _SECONDS, ("step", "outcome"))
+
+_METRICS = [REQUESTS, STAGE_SECONDS, CHARS_PER_SECOND, WEBDRIVER_CALLS, WAIT_SECONDS]
+
+def render() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# =============================================================================================================================
+# WebDriver Instrumentation
+# =============================================================================================================================
+
+def instrument_driver(driver) -> None:
+    if getattr(driver, "_intense_calls", None) is not None:
+        return
+
+    execute = driver.execute
+    driver._intense_calls = 0
+
+    def counted_execute(*args, **kwargs):
+        driver._intense_calls += 1
+        return execute(*args, **kwargs)
+
+    driver.execute = counted_execute
+
+def webdriver_calls(driver) -> int:
+    return getattr(driver, "_intense_calls", 0) or 0
@@ -0,0 +1,115 @@
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+import threading, time
+
+# =============================================================================================================================
+# Generation
+# =============================================================================================================================
+
+class Generation:
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.result = ""
+        self.done = False
+        self.followers = 0
+        self._lock = threading.Condition()
+
+    def has_followers(self) -> bool:
+        with self._lock:
+            return self.followers > 0
+
+    def publish(self, text: str) -> None:
+        if not text:
+            return
+
+        with self._lock:
+            self.chunks.append(text)
+            self._lock.notify_all()
+
+    def _finish(self, result: str) -> bool:
+        with self._lock:
+            if self.done:
+                return False
+
+            self.result = result or ""
+            self.done = True
+            self._lock.notify_all()
+            return True
+
+    def leave(self) -> None:
+        # Every follower that joined through begin() must call this exactly once, however its response ends.
+        with self._lock:
+            self.followers -= 1
+
+    def stream(self, cancelled: Optional[Callable[[], bool]] = None, keep_alive: Optional[float] = None) -> Generator[str, None, None]:
+        # With keep_alive set, an empty string is yielded after that many seconds without a chunk.
+        index = 0
+        quiet_since = time.monotonic()
+        while True:
+            with self._lock:
+                while index == len(self.chunks) and not self.done:
+                    if cancelled and cancelled():
+                        return
+                    
+                    remaining = keep_alive - (time.monotonic() - quiet_since) if keep_alive else 1.0
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(min(1.0, remaining))
+
+                pending = self.chunks[index:]
+                index = len(self.chunks)
+                finished = self.done and not pending
+
+            if not pending and not finished:
+                quiet_since = time.monotonic()
+                yield ""
+                continue
+
+            if finished:
+                # A leader that failed before generating only has its final text to share.
+                if not self.chunks and self.result:
+                    yield self.result
+                return
+
+            for chunk in pending:
+                yield chunk
+            quiet_since = time.monotonic()
+
+    def wait(self, cancelled: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        with self._lock:
+            while not self.done:
+                if cancelled and cancelled():
+                    return None
+                self._lock.wait(1.0)
+            return self.result
+
+# =============================================================================================================================
+# Request Coalescer
+# =============================================================================================================================
+
+class RequestCoalescer:
+    def __init__(self):
+        self._active: Dict[str, Generation] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, shared: bool = True) -> Tuple[Generation, bool]:
+        # An unshared generation is never joined and never joins one in progress.
+        if not shared:
+            return Generation(key), True
+
+        with self._lock:
+            generation = self._active.get(key)
+            if generation and not generation.done:
+                with generation._lock:
+                    generation.followers += 1
+                return generation, False
+
+            generation = Generation(key)
+            self._active[key] = generation
+            return generation, True
+
+    def end(self, generation: Generation, result: str) -> None:
+        with self._lock:
+            if self._active.get(generation.key) is generation:
+                del self._active[generation.key]
+        generation._finish(result)
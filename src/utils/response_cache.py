@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib, json, threading, time
+
+manager = None
+
+CACHE_FILE = "response_cache.enc"
+SAVE_DELAY = 2.0
+
+# =============================================================================================================================
+# Cache Keys
+# =============================================================================================================================
+
+def make_key(character_info: str, deepthink: bool, search: bool, text_file: bool, limits: list = None) -> str:
+    # Output limits only join the key when they are enforced, so keys without them stay unchanged.
+    flags = json.dumps([bool(deepthink), bool(search), bool(text_file)] + ([limits] if limits else []))
+    digest = hashlib.sha256(flags.encode("utf-8"))
+    digest.update(character_info.encode("utf-8"))
+    return digest.hexdigest()
+
+# =============================================================================================================================
+# Response Cache
+# =============================================================================================================================
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 64, ttl: float = 600):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self.enabled = False
+        self.persist = False
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def configure(self, enabled: bool, max_entries: int, ttl: float, persist: bool) -> None:
+        with self._lock:
+            self.enabled = bool(enabled)
+            self.max_entries = max(1, int(max_entries))
+            self.ttl = max(1.0, float(ttl))
+            self.persist = bool(persist) and self.enabled
+
+        if self.persist:
+            self._load()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return now - created > self.ttl
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k, (_, created) in self._entries.items() if self._expired(created, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+
+            text, created = entry
+            if self._expired(created, time.time()):
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        if not self.enabled or not key or not text:
+            return
+
+        with self._lock:
+            now = time.time()
+            self._entries[key] = (text, now)
+            self._entries.move_to_end(key)
+            self._evict(now)
+
+        if self.persist:
+            self._schedule_save()
+
+    # =========================================================================================================================
+    # Persistence
+    # =========================================================================================================================
+
+    def _schedule_save(self) -> None:
+        if not manager:
+            return
+
+        # Writes are batched on a timer so responses never wait on disk, and a burst of puts costs one save.
+        with self._lock:
+            if self._save_timer:
+                return
+            self._save_timer = threading.Timer(SAVE_DELAY, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self) -> None:
+        if not manager:
+            return
+
+        # Only one save touches the temporary file at a time; the snapshot is taken inside so the last writer is newest.
+        with self._save_lock:
+            with self._lock:
+                self._save_timer = None
+                data = {key: [text, created] for key, (text, created) in self._entries.items()}
+            manager.save_data(path_root="executable", sub_path="save", filename=CACHE_FILE, data=data)
+
+    def _load(self) -> None:
+        if not manager:
+            return
+
+        data = manager.load_data(path_root="executable", sub_path="save", filename=CACHE_FILE)
+        entries = [
+            (key, (entry[0], float(entry[1]))) for key, entry in data.items()
+            if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[0], str) and isinstance(entry[1], (int, float))
+        ]
+        entries.sort(key=lambda item: item[1][1])
+
+        with self._lock:
+            self._entries.update(entries)
+            self._evict(time.time())
@@ -1,5 +1,6 @@
 from flask import jsonify, Response
-import re, time, json
+from collections import OrderedDict
+import re, time, json, threading
 
 __version__ = "2.0.0"
 
@@ -7,6 +8,133 @@ __version__ = "2.0.0"
 # Character Processing
 # =============================================================================================================================
 
+_R1_MARKERS = re.compile(r"({{r1}}|\[r1\]|\(r1\))", re.IGNORECASE)
+_SEARCH_MARKERS = re.compile(r"({{search}}|\[search\])", re.IGNORECASE)
+_CHARACTER_NAME = re.compile(r'DATA1:\s*"([^"]*)"')
+_USER_NAME = re.compile(r'DATA2:\s*"([^"]*)"')
+_NEWLINES = re.compile(r"\n{3,}")
+
+_MESSAGE_CACHE_SIZE = 20000
+_message_cache = OrderedDict()
+_render_cache = OrderedDict()
+_last_prompt = ([], "")
+_cache_lock = threading.Lock()
+
+def _legacy_character_info(messages: list, temperature, max_tokens) -> str:
+    formatted_messages = [f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in messages]
+    character_info = "\n\n".join(formatted_messages)
+
+    character_name_match = re.search(r'DATA1:\s*"([^"]*)"', character_info)
+    user_name_match = re.search(r'DATA2:\s*"([^"]*)"', character_info)
+
+    character_name = character_name_match.group(1) if character_name_match else "Character"
+    user_name = user_name_match.group(1) if user_name_match else "User"
+
+    character_info = re.sub(r"({{r1}}|\[r1\]|\(r1\))", "", character_info, flags=re.IGNORECASE)
+    character_info = re.sub(r"({{search}}|\[search\])", "", character_info, flags=re.IGNORECASE)
+    character_info = re.sub(r'DATA1:\s*"[^"]*"', "", character_info)
+    character_info = re.sub(r'DATA2:\s*"[^"]*"', "", character_info)
+    
+    character_info = character_info.replace("system: ", "")
+    character_info = character_info.replace("assistant:", f"{character_name}:")
+    character_info = character_info.replace("user:", f"{user_name}:")
+    
+    character_info = character_info.replace("{{temperature}}", str(temperature))
+    character_info = character_info.replace("{{max_tokens}}", str(max_tokens))
+
+    return re.sub(r"\n{3,}", "\n\n", character_info)
+
+def _prepare_message(formatted: str) -> tuple | None:
+    # Everything that does not depend on the names, temperature or token limit; None when a
+    # DATA tag could span into the next message, which only the whole-history pass handles.
+    entry = _message_cache.get(formatted)
+    if entry is not None:
+        _message_cache.move_to_end(formatted)
+        return entry
+
+    character_names = _CHARACTER_NAME.findall(formatted)
+    user_names = _USER_NAME.findall(formatted)
+    if formatted.count("DATA1:") != len(character_names) or formatted.count("DATA2:") != len(user_names):
+        return None
+
+    text = _R1_MARKERS.sub("", formatted)
+    text = _SEARCH_MARKERS.sub("", text)
+    text = _CHARACTER_NAME.sub("", text)
+    text = _USER_NAME.sub("", text)
+    if "DATA1:" in text or "DATA2:" in text:
+        return None
+
+    entry = (text, character_names[0] if character_names else None, user_names[0] if user_names else None)
+    _message_cache[formatted] = entry
+    return entry
+
+def _render_message(text: str, replacements: tuple) -> str:
+    key = (text, replacements)
+    rendered = _render_cache.get(key)
+    if rendered is not None:
+        _render_cache.move_to_end(key)
+        return rendered
+
+    character_name, user_name, temperature, max_tokens = replacements
+    rendered = text.replace("system: ", "")
+    rendered = rendered.replace("assistant:", f"{character_name}:")
+    rendered = rendered.replace("user:", f"{user_name}:")
+    rendered = rendered.replace("{{temperature}}", temperature)
+    rendered = rendered.replace("{{max_tokens}}", max_tokens)
+    # Newline runs never cross messages once each one is trimmed and they are joined by a blank line.
+    rendered = _NEWLINES.sub("\n\n", rendered).strip("\n")
+    _render_cache[key] = rendered
+    return rendered
+
+def _prepare_messages(messages: list) -> list | None:
+    entries = []
+    for msg in messages:
+        entry = _prepare_message(f"{msg.get('role', '')}: {msg.get('content', '')}")
+        if entry is None:
+            return None
+        entries.append(entry)
+
+    while len(_message_cache) > max(_MESSAGE_CACHE_SIZE, len(entries) * 2):
+        _message_cache.popitem(last=False)
+    return entries
+
+def _replacements(entries: list, temperature, max_tokens) -> tuple:
+    character_name = next((entry[1] for entry in entries if entry[1] is not None), "Character")
+    user_name = next((entry[2] for entry in entries if entry[2] is not None), "User")
+    return (character_name, user_name, str(temperature), str(max_tokens))
+
+def _render_messages(entries: list, replacements: tuple) -> list:
+    pieces = []
+    for text, _, _ in entries:
+        rendered = _render_message(text, replacements)
+        if rendered:
+            pieces.append(rendered)
+
+    while len(_render_cache) > max(_MESSAGE_CACHE_SIZE, len(entries) * 2):
+        _render_cache.popitem(last=False)
+    return pieces
+
+def _incremental_character_info(messages: list, temperature, max_tokens) -> str | None:
+    global _last_prompt
+    with _cache_lock:
+        entries = _prepare_messages(messages)
+        if entries is None:
+            return None
+
+        pieces = _render_messages(entries, _replacements(entries, temperature, max_tokens))
+
+        # A new turn usually only appends messages, so the previous prompt is a prefix of this one.
+        previous, assembled = _last_prompt
+        if previous and len(previous) <= len(pieces) and all(a is b for a, b in zip(previous, pieces)):
+            rest = pieces[len(previous):]
+            if rest:
+                assembled = assembled + "\n\n" + "\n\n".join(rest)
+        else:
+            assembled = "\n\n".join(pieces)
+
+        _last_prompt = (pieces, assembled)
+        return assembled
+
 def process_character(put_data: dict) -> str | None:
     try:
         messages = put_data.get("messages", [])
@@ -16,34 +144,30 @@ def process_character(put_data: dict) -> str | None:
         if len(messages) >= 2 and messages[-1].get("role") == "system" and messages[-2].get("role") == "system":
             messages.pop(-2)
 
-        formatted_messages = [f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in messages]
-        character_info = "\n\n".join(formatted_messages)
-
-        character_name_match = re.search(r'DATA1:\s*"([^"]*)"', character_info)
-        user_name_match = re.search(r'DATA2:\s*"([^"]*)"', character_info)
-
-        character_name = character_name_match.group(1) if character_name_match else "Character"
-        user_name = user_name_match.group(1) if user_name_match else "User"
-
-        character_info = re.sub(r"({{r1}}|\[r1\]|\(r1\))", "", character_info, flags=re.IGNORECASE)
-        character_info = re.sub(r"({{search}}|\[search\])", "", character_info, flags=re.IGNORECASE)
-        character_info = re.sub(r'DATA1:\s*"[^"]*"', "", character_info)
-        character_info = re.sub(r'DATA2:\s*"[^"]*"', "", character_info)
-        
-        character_info = character_info.replace("system: ", "")
-        character_info = character_info.replace("assistant:", f"{character_name}:")
-        character_info = character_info.replace("user:", f"{user_name}:")
-        
-        character_info = character_info.replace("{{temperature}}", str(temperature))
-        character_info = character_info.replace("{{max_tokens}}", str(max_tokens))
-    
-        character_info = re.sub(r"\n{3,}", "\n\n", character_info)
+        character_info = _incremental_character_info(messages, temperature, max_tokens)
+        if character_info is None:
+            character_info = _legacy_character_info(messages, temperature, max_tokens)
 
         return f"[Important Information]\n{character_info.strip()}"
     except Exception as e:
         print(f"Error processing character info: {e}")
         return None
 
+def format_continuation(put_data: dict, start: int) -> str | None:
+    # Only the messages from start on, rendered with the names found anywhere in the history.
+    try:
+        messages = put_data.get("messages", [])
+        with _cache_lock:
+            entries = _prepare_messages(messages)
+            if entries is None:
+                return None
+            pieces = _render_messages(entries[start:], _replacements(entries, put_data.get("temperature", 1), put_data.get("max_tokens", 300)))
+
+        return "\n\n".join(pieces).strip() or None
+    except Exception as e:
+        print(f"Error processing continuation: {e}")
+        return None
+
 # =============================================================================================================================
 # Response Settings
 # =============================================================================================================================
@@ -51,6 +175,71 @@ def process_character(put_data: dict) -> str | None:
 def get_streaming(put_data: dict) -> bool:
     return bool(put_data.get("stream", False))
 
+def get_max_tokens(put_data: dict) -> int | None:
+    try:
+        max_tokens = int(put_data.get("max_tokens") or 0)
+        return max_tokens if max_tokens > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+def get_stop_sequences(put_data: dict) -> list:
+    stop = put_data.get("stop") or []
+    if isinstance(stop, str):
+        stop = [stop]
+    return [s for s in stop if isinstance(s, str) and s]
+
+# =============================================================================================================================
+# Output Limits
+# =============================================================================================================================
+
+# Roughly how BPE tokenizers split text: short letter runs, digit groups and single symbols.
+_TOKEN = re.compile(r"[^\W\d_]{1,4}|\d{1,3}|[^\w\s]")
+
+class OutputLimits:
+    """Cuts a growing reply at the request's max_tokens or at its first stop sequence."""
+
+    def __init__(self, max_tokens: int | None, stops: list):
+        self.max_tokens = max_tokens
+        self.stops = stops
+        self.reason = None
+        self._longest = max((len(stop) for stop in stops), default=0)
+        self._tokens = 0
+        self._counted = 0
+        self._searched = 0
+
+    def _partial_stop(self, text: str) -> int:
+        # Length of the longest tail that could still become a stop sequence.
+        for size in range(min(self._longest - 1, len(text)), 0, -1):
+            tail = text[-size:]
+            if any(stop.startswith(tail) for stop in self.stops):
+                return size
+        return 0
+
+    def update(self, text: str, final: bool = False) -> str:
+        # Returns the part of the text that may be sent; reason is set once a limit is reached.
+        end = len(text)
+        if self.stops:
+            start = max(0, self._searched - self._longest + 1)
+            for stop in self.stops:
+                index = text.find(stop, start)
+                if index != -1 and index < end:
+                    end, self.reason = index, "stop"
+            self._searched = len(text)
+
+        if self.max_tokens:
+            for match in _TOKEN.finditer(text, self._counted, end):
+                if match.end() == len(text) and not final:
+                    break
+                self._tokens += 1
+                self._counted = match.end()
+                if self._tokens >= self.max_tokens:
+                    end, self.reason = match.end(), "length"
+                    break
+
+        if not self.reason and not final and self.stops:
+            end -= self._partial_stop(text)
+        return text[:end]
+
 # =============================================================================================================================
 # DeepSeek Settings
 # =============================================================================================================================
@@ -86,7 +275,7 @@ def get_model() -> Response:
 # Response System
 # =============================================================================================================================
 
-def create_response_jsonify(text: str) -> Response:
+def create_response_jsonify(text: str, finish_reason: str = "stop") -> Response:
     global __version__
     return jsonify({
         "id": "chatcmpl-intenserp",
@@ -96,20 +285,37 @@ def create_response_jsonify(text: str) -> Response:
         "choices": [{
             "index": 0,
             "message": {"role": "assistant", "content": text},
-            "finish_reason": "stop"
+            "finish_reason": finish_reason
         }]
     })
 
-def create_response_streaming(text: str) -> str:
+def create_response_streaming(text: str, finish_reason: str | None = None) -> str:
+    global __version__
+    choice = {"index": 0, "delta": {"content": text}}
+    if finish_reason:
+        choice["finish_reason"] = finish_reason
+    return "data: " + json.dumps({
+                    "id": "chatcmpl-intenserp",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time() * 1000),
+                    "model": f"rp-intense-{__version__}",
+                    "choices": [choice]
+                }) + "\n\n"
+
+def create_response_role() -> str:
+    # Opens a stream before any text exists, the way OpenAI's first chunk does.
     global __version__
     return "data: " + json.dumps({
                     "id": "chatcmpl-intenserp",
                     "object": "chat.completion.chunk",
                     "created": int(time.time() * 1000),
                     "model": f"rp-intense-{__version__}",
-                    "choices": [{"index": 0, "delta": {"content": text}}]
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]
                 }) + "\n\n"
 
+def create_keep_alive() -> str:
+    return ": keep-alive\n\n"
+
 def create_response(text: str, streaming: bool) -> Response:
     if streaming:
         return Response(create_response_streaming(text), content_type="text/event-stream")
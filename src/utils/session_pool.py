@@ -0,0 +1,180 @@
+import utils.webdriver_utils as selenium
+from seleniumbase import Driver
+from typing import Callable, List, Optional
+from collections import deque
+import math, threading, time
+
+# =============================================================================================================================
+# Queue Errors
+# =============================================================================================================================
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("The request queue is full.")
+        self.retry_after = retry_after
+
+class QueueTimeoutError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Timed out waiting for a browser session.")
+        self.retry_after = retry_after
+
+class QueueCancelledError(Exception):
+    def __init__(self):
+        super().__init__("The client left while waiting for a browser session.")
+
+# =============================================================================================================================
+# Browser Session
+# =============================================================================================================================
+
+class BrowserSession:
+    def __init__(self, index: int, driver: Driver):
+        self.index = index
+        self.driver = driver
+        self.request_id = 0
+        self.busy = False
+        self.leased_at = 0.0
+        self.conversation = None
+        self.last_request = None
+        self.last_reply_at = 0.0
+        self.prepared = None
+
+    def owned_by(self, request_id: int) -> bool:
+        return self.driver is not None and self.request_id == request_id
+
+# =============================================================================================================================
+# Session Pool
+# =============================================================================================================================
+
+class SessionPool:
+    def __init__(self, max_queue: int = 8, queue_timeout: float = 120):
+        self._sessions: List[BrowserSession] = []
+        self._lock = threading.Condition()
+        self._waiting = deque()
+        self._average_duration = 30.0
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+    def configure(self, max_queue: int, queue_timeout: float) -> None:
+        with self._lock:
+            self.max_queue = max(0, int(max_queue))
+            self.queue_timeout = max(1.0, float(queue_timeout))
+
+    def start(self, browser: str, url: str, size: int = 1, on_ready: Optional[Callable[[Driver], None]] = None) -> int:
+        size = max(1, int(size or 1))
+        for index in range(size):
+            driver = selenium.initialize_webdriver(browser, url)
+            if not driver:
+                print(f"Error starting browser session {index + 1}.")
+                continue
+
+            session = self.add(driver)
+            if on_ready:
+                try:
+                    on_ready(driver)
+                except Exception as e:
+                    print(f"Error preparing browser session {session.index}: {e}")
+
+        return len(self._sessions)
+
+    def add(self, driver: Driver) -> BrowserSession:
+        with self._lock:
+            session = BrowserSession(len(self._sessions) + 1, driver)
+            self._sessions.append(session)
+            self._lock.notify_all()
+            return session
+
+    def sessions(self) -> List[BrowserSession]:
+        with self._lock:
+            return list(self._sessions)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def is_active(self) -> bool:
+        return self.size() > 0
+
+    def queue_length(self) -> int:
+        with self._lock:
+            return len(self._waiting)
+
+    def _free_session(self, prefer: Optional[Callable[[BrowserSession], bool]] = None) -> Optional[BrowserSession]:
+        free = [s for s in self._sessions if not s.busy]
+        if prefer:
+            preferred = next((s for s in free if prefer(s)), None)
+            if preferred:
+                return preferred
+        return free[0] if free else None
+
+    def _retry_after(self) -> int:
+        sessions = max(1, len(self._sessions))
+        return max(1, math.ceil(self._average_duration * (len(self._waiting) + 1) / sessions))
+
+    def _take(self, session: BrowserSession, request_id: int) -> BrowserSession:
+        session.busy = True
+        session.request_id = request_id
+        session.leased_at = time.monotonic()
+        return session
+
+    def lease(self, request_id: int, cancelled: Optional[Callable[[], bool]] = None, prefer: Optional[Callable[[BrowserSession], bool]] = None) -> Optional[BrowserSession]:
+        with self._lock:
+            if not self._sessions:
+                return None
+
+            session = self._free_session(prefer)
+            if session and not self._waiting:
+                return self._take(session, request_id)
+
+            if len(self._waiting) >= self.max_queue:
+                raise QueueFullError(self._retry_after())
+
+            self._waiting.append(request_id)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while True:
+                    if not self._sessions:
+                        return None
+
+                    session = self._free_session(prefer)
+                    if session and self._waiting[0] == request_id:
+                        return self._take(session, request_id)
+
+                    if cancelled and cancelled():
+                        raise QueueCancelledError()
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise QueueTimeoutError(self._retry_after())
+
+                    self._lock.wait(min(remaining, 1.0))
+            finally:
+                self._waiting.remove(request_id)
+                self._lock.notify_all()
+
+    def release(self, session: BrowserSession, request_id: int) -> None:
+        with self._lock:
+            if session.request_id == request_id and session.busy:
+                session.busy = False
+                duration = time.monotonic() - session.leased_at
+                self._average_duration = self._average_duration * 0.8 + duration * 0.2
+                self._lock.notify_all()
+
+    def remove(self, session: BrowserSession) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            session.driver = None
+            self._lock.notify_all()
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._lock.notify_all()
+
+        for session in sessions:
+            try:
+                if session.driver:
+                    session.driver.quit()
+            except Exception:
+                pass
+            session.driver = None
@@ -131,6 +131,52 @@ class StorageManager:
             print(f"Error loading config: {e}")
             return original or {}
     
+    def save_data(self, path_root: str = "base", sub_path: str = "save", filename: str = "", data: Optional[Dict] = None) -> bool:
+        try:
+            save_path = self.get_path(path_root, sub_path)
+            if not save_path or not filename:
+                raise ValueError("Invalid save path.")
+
+            os.makedirs(save_path, exist_ok=True)
+
+            key = self._load_key(path_root, sub_path)
+            if not key:
+                self._generate_key(path_root, sub_path)
+                key = self._load_key(path_root, sub_path)
+                if not key:
+                    raise ValueError("Could not load encryption key.")
+
+            encrypted_data = Fernet(key).encrypt(json.dumps(data or {}).encode("utf-8"))
+
+            data_path = os.path.join(save_path, filename)
+            with open(data_path + ".tmp", "wb") as f:
+                f.write(encrypted_data)
+            os.replace(data_path + ".tmp", data_path)
+            return True
+        except Exception as e:
+            print(f"Error saving {filename}: {e}")
+            return False
+
+    def load_data(self, path_root: str = "base", sub_path: str = "save", filename: str = "") -> Dict:
+        try:
+            save_path = self.get_path(path_root, sub_path)
+            if not save_path or not filename:
+                raise ValueError("Invalid save path.")
+
+            key = self._load_key(path_root, sub_path)
+            data_path = os.path.join(save_path, filename)
+            if not key or not os.path.exists(data_path):
+                return {}
+
+            with open(data_path, "rb") as f:
+                decrypted = Fernet(key).decrypt(f.read())
+
+            data = json.loads(decrypted.decode("utf-8"))
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"Error loading {filename}: {e}")
+            return {}
+    
     def delete_file(self, path_root: str = "base", relative_path: Optional[str] = None) -> bool:
         try:
             if not relative_path:
@@ -0,0 +1,27 @@
+import utils.metrics as metrics
+from typing import Any, Callable
+import time
+
+# =============================================================================================================================
+# Condition Waits
+# =============================================================================================================================
+
+def wait_for(step: str, condition: Callable[[], Any], timeout: float, interval: float = 0.05) -> Any:
+    # Polls until the condition returns something truthy; lookups that raise count as "not yet".
+    started = time.perf_counter()
+    deadline = started + timeout
+    while True:
+        try:
+            value = condition()
+        except Exception:
+            value = None
+
+        if value:
+            metrics.WAIT_SECONDS.observe(time.perf_counter() - started, step, "met")
+            return value
+
+        if time.perf_counter() >= deadline:
+            metrics.WAIT_SECONDS.observe(time.perf_counter() - started, step, "timeout")
+            return value
+
+        time.sleep(interval)